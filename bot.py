@@ -4,6 +4,7 @@ import json
 import asyncio
 import logging
 import signal
+import sys
 import time
 import contextlib
 import logging.handlers
@@ -14,8 +15,14 @@ from src.api_handler import ApiHandler
 from src.position_tracker import PositionTracker
 from src.trade_executor import AsyncTradeExecutor
 from src.strategy_manager import StrategyManager
+from src.market_data_hub import MarketDataHub
 from src.volatility_regime_filter import VolatilityRegimeFilter
 
+try:
+    import uvloop
+except ImportError:  # optional; not available on Windows
+    uvloop = None
+
 GRACEFUL_SHUTDOWN_TIMEOUT = 30
 
 def validate_config(cfg):
@@ -95,7 +102,8 @@ async def shutdown(app):
                 logging.info(f"Closing {name}")
                 await asyncio.wait_for(component.close(), timeout=5)
             elif hasattr(component, "stop"):
-                component.stop()
+                logging.info(f"Stopping {name}")
+                await asyncio.wait_for(component.stop(), timeout=5)
         except asyncio.TimeoutError:
             logging.warning(f"Timeout closing {name}")
         except Exception as e:
@@ -137,11 +145,23 @@ async def main():
         logging.critical(f"API initialization failed: {str(e)}")
         return
     
+    # Symbols key the cooldown, position and hub dicts on every cycle; intern them once
+    symbols = [sys.intern(s) for s in config.get("symbols", ["BTC/USDT"])]
+    
+    hub = None
+    if not config.get("disable_ws", False):
+        if MarketDataHub.available():
+            hub = MarketDataHub(api, config)
+            await hub.subscribe(symbols)
+        else:
+            logging.warning("ccxt.pro not installed, strategies will poll REST")
+    
     tracker = PositionTracker(config, api)
     executor = AsyncTradeExecutor(api, config)
     await executor.start()
     
-    strategy_manager = StrategyManager(config, api, tracker, executor)
+    strategy_manager = StrategyManager(config, api, tracker, executor, hub=hub)
+    await strategy_manager.warmup(symbols)
     volatility_filter = VolatilityRegimeFilter(api, config)
     
     app = web.Application()
@@ -152,6 +172,8 @@ async def main():
         "strategy_manager": strategy_manager,
         "volatility_filter": volatility_filter
     }
+    if hub:
+        app["components"]["market_data"] = hub
     app.router.add_get("/health", health)
     
     if not await start_http_server(app, config["health_port"]):
@@ -166,7 +188,9 @@ async def main():
     
     app["cycle_count"] = 0
     consecutive_errors = 0
-    symbols = config.get("symbols", ["BTC/USDT"])
+    dynamic_universe = config.get("dynamic_universe", False)
+    universe_refresh_sec = config.get("universe_refresh_sec", 300)
+    next_universe_refresh = 0.0
     
     try:
         logging.info("✅ Starting trading loop")
@@ -176,11 +200,28 @@ async def main():
             cycle_count = app["cycle_count"]
             
             try:
+                # Candles are shared between the filter and strategies within a cycle only
+                api.clear_ohlcv_cache()
+                # Only reloads once the markets are an hour old; contract sizes and
+                # price scales are otherwise read from the cached copy
+                await api.load_markets()
+                
+                # Re-rank the trading universe periodically
+                if dynamic_universe and time.monotonic() >= next_universe_refresh:
+                    next_universe_refresh = time.monotonic() + universe_refresh_sec
+                    ranked = await strategy_manager.rank_universe()
+                    if ranked and ranked != symbols:
+                        dropped = set(symbols).difference(ranked)
+                        symbols = ranked
+                        logging.info("Trading universe: %s", ", ".join(symbols))
+                        if hub:
+                            # Streams for rotated-out symbols would otherwise live on forever
+                            await hub.unsubscribe(dropped)
+                            await hub.subscribe(symbols)
+                        await strategy_manager.warmup(symbols)
+                
                 # Apply volatility filter
-                tradable_symbols = []
-                for symbol in symbols:
-                    if await volatility_filter.allow_trading(symbol):
-                        tradable_symbols.append(symbol)
+                tradable_symbols = await volatility_filter.filter_symbols(symbols)
                 
                 # Run strategy manager
                 if tradable_symbols:
@@ -194,7 +235,7 @@ async def main():
                 
             except Exception as e:
                 consecutive_errors += 1
-                logging.error(f"Trading cycle error: {str(e)}")
+                logging.error("Trading cycle error: %s", e)
                 if consecutive_errors > 5:
                     logging.critical("Too many consecutive errors, shutting down")
                     await shutdown(app)
@@ -243,6 +284,8 @@ async def report_status(tracker, cycle_count):
         logging.error(f"Reporting error: {str(e)}")
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        uvloop.install()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -0,0 +1,89 @@
+# _ta_kernels.py
+import numpy as np
+
+from src.utils import njit, prange
+
+# Compiled indicator kernels. They follow TA-Lib's conventions (SMA-seeded EMA,
+# Wilder-smoothed RSI over the whole series) so either backend gives the same
+# signals. Without numba, njit is a no-op and these run as plain Python.
+#
+# Explicit signatures make numba compile (or load from the on-disk cache) at
+# import instead of on the first trading tick. Close arrays are typed with
+# "A" layout so strided column slices are accepted without a copy.
+
+@njit("UniTuple(float64, 3)(float64[:], int64, int64, int64)", cache=True, fastmath=True)
+def _ema_rsi_kernel(closes, ema_short_p, ema_long_p, rsi_p):
+    """Last short EMA, long EMA and RSI of a float64 close series.
+
+    All three are advanced in a single pass over ``closes``; an indicator
+    without enough bars comes back as NaN.
+    """
+    n = closes.shape[0]
+    k_short = 2.0 / (ema_short_p + 1)
+    k_long = 2.0 / (ema_long_p + 1)
+    inv = 1.0 / rsi_p
+    decay = (rsi_p - 1) * inv
+
+    ema_short = 0.0
+    ema_long = 0.0
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(n):
+        x = closes[i]
+
+        if i < ema_short_p:
+            ema_short += x
+            if i == ema_short_p - 1:
+                ema_short /= ema_short_p
+        else:
+            ema_short += (x - ema_short) * k_short
+
+        if i < ema_long_p:
+            ema_long += x
+            if i == ema_long_p - 1:
+                ema_long /= ema_long_p
+        else:
+            ema_long += (x - ema_long) * k_long
+
+        if i > 0:
+            delta = x - closes[i - 1]
+            # max() lowers to maxsd, so there is no data-dependent branch per bar
+            gain = max(delta, 0.0)
+            loss = max(-delta, 0.0)
+            if i <= rsi_p:
+                avg_gain += gain
+                avg_loss += loss
+                if i == rsi_p:
+                    avg_gain *= inv
+                    avg_loss *= inv
+            else:
+                avg_gain = avg_gain * decay + gain * inv
+                avg_loss = avg_loss * decay + loss * inv
+
+    if n < ema_short_p:
+        ema_short = np.nan
+    if n < ema_long_p:
+        ema_long = np.nan
+    if n <= rsi_p:
+        rsi = np.nan
+    else:
+        total = avg_gain + avg_loss
+        rsi = 100.0 * avg_gain / total if total > 0 else 0.0
+    return ema_short, ema_long, rsi
+
+@njit("float64[:, :](float64[:, :], int64, int64, int64)", cache=True, parallel=True, fastmath=True)
+def ema_rsi_batch(closes, ema_short_p, ema_long_p, rsi_p):
+    """Row-wise _ema_rsi_kernel over a (symbols, bars) close matrix.
+
+    Returns a (symbols, 3) array of short EMA, long EMA and RSI. Rows are
+    independent and spread across numba's thread pool with prange; the pool
+    size follows NUMBA_NUM_THREADS or the ``numba_threads`` config cap.
+    """
+    n = closes.shape[0]
+    out = np.empty((n, 3))
+    for i in prange(n):
+        ema_short, ema_long, rsi = _ema_rsi_kernel(closes[i], ema_short_p, ema_long_p, rsi_p)
+        out[i, 0] = ema_short
+        out[i, 1] = ema_long
+        out[i, 2] = rsi
+    return out
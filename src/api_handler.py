@@ -18,6 +18,13 @@ class ApiHandler:
         self.last_market_load = 0
         self.semaphore = asyncio.Semaphore(10)  # Increased concurrency
         self.market_load_lock = asyncio.Lock()
+        self._price_scale_requests: Dict[str, asyncio.Future] = {}
+        # (symbol, timeframe, limit) -> candles, kept until clear_ohlcv_cache(); empty
+        # results are kept too so symbols without data aren't re-queried
+        self._ohlcv_cache: Dict[tuple, list] = {}
+        # symbol -> (time.monotonic() fetched, ticker); quotes go stale fast, so keep it short
+        self._ticker_cache: Dict[str, tuple] = {}
+        self.ticker_cache_ttl = float(self.config.get("ticker_cache_ttl", 0.5))
        
     def _init_exchange(self, api_key, api_secret):
         params = {
@@ -35,12 +42,15 @@ class ApiHandler:
         
     async def load_markets(self, reload=False):
         """Load markets with robust error handling for precision data"""
-        current_time = time.time()
+        # Monotonic: only the age of the last load matters, not wall-clock time
+        current_time = time.monotonic()
         if reload or not self.market_map or (current_time - self.last_market_load) > 3600:
             async with self.market_load_lock:
                 if reload or not self.market_map or (current_time - self.last_market_load) > 3600:
                     try:
-                        markets = await self.exchange.load_markets()
+                        # ccxt otherwise hands back its cached markets, which would
+                        # make the hourly refresh a no-op
+                        markets = await self.exchange.load_markets(True)
                         self.market_map = {}
                         self.price_scales = {}
                         
@@ -68,19 +78,39 @@ class ApiHandler:
                             self.price_scales = {}
                 
     async def get_price_scale(self, symbol: str) -> int:
-        """Get price scale with automatic reload on failure"""
-        if symbol not in self.price_scales:
-            try:
-                market = await self.exchange.load_market(symbol)
-                self.price_scales[symbol] = 10 ** market['precision']['price']
-            except:
-                await self.load_markets(reload=True)
+        """Get price scale, sharing one in-flight lookup between concurrent callers"""
+        scale = self.price_scales.get(symbol)
+        if scale is not None:
+            return scale
+        
+        pending = self._price_scale_requests.get(symbol)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load_price_scale(symbol))
+            self._price_scale_requests[symbol] = pending
+            pending.add_done_callback(lambda _: self._price_scale_requests.pop(symbol, None))
+        return await asyncio.shield(pending)
+        
+    async def _load_price_scale(self, symbol: str) -> int:
+        """Load price scale with automatic reload on failure"""
+        try:
+            market = await self.exchange.load_market(symbol)
+            self.price_scales[symbol] = 10 ** market['precision']['price']
+        except:
+            await self.load_markets(reload=True)
         return self.price_scales.get(symbol, 100)
         
     async def get_contract_size(self, symbol: str) -> float:
         """Get contract size with fallback"""
         await self.load_markets()
-        market = self.exchange.markets.get(symbol)
+        return self.cached_contract_size(symbol)
+        
+    def cached_contract_size(self, symbol: str) -> float:
+        """Contract size from the already loaded markets, without refreshing them.
+
+        The trading loop calls load_markets() every cycle, which keeps these
+        (and the price scales) at most an hour old.
+        """
+        market = (self.exchange.markets or {}).get(symbol)
         return market.get("contractSize", 1.0) if market else 1.0
         
     def _timeframe_to_seconds(self, timeframe: str) -> int:
@@ -149,12 +179,24 @@ class ApiHandler:
         limit: int = 20,
         since: Optional[int] = None
     ) -> List[List[float]]:
-        return await self.fetch_ohlcv_robust(
-            symbol=symbol,
-            timeframe=timeframe,
-            since=since,
-            limit=limit
-        )
+        """OHLCV rows, served from the cycle's cache when ``since`` isn't given.
+
+        Entries live until clear_ohlcv_cache(), which the trading loop calls at
+        the start of every cycle, so each cycle sees the forming bar afresh.
+        """
+        if since is not None:
+            return await self.fetch_ohlcv_robust(symbol, timeframe, since, limit)
+            
+        key = (symbol, timeframe, limit)
+        candles = self._ohlcv_cache.get(key)
+        if candles is None:
+            candles = await self.fetch_ohlcv_robust(symbol, timeframe, None, limit)
+            self._ohlcv_cache[key] = candles
+        return candles
+        
+    def clear_ohlcv_cache(self):
+        """Drop every cached OHLCV entry; called at the start of each trading cycle"""
+        self._ohlcv_cache.clear()
         
     async def place_order(
         self, 
@@ -196,12 +238,34 @@ class ApiHandler:
             return []
             
     async def fetch_ticker(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Ticker for ``symbol``, reused for ``ticker_cache_ttl`` seconds across callers"""
+        cached = self._ticker_cache.get(symbol)
+        if cached is not None and time.monotonic() - cached[0] < self.ticker_cache_ttl:
+            return cached[1]
         try:
             async with self.semaphore:
-                return await self.exchange.fetch_ticker(symbol)
+                ticker = await self.exchange.fetch_ticker(symbol)
         except Exception as e:
             logger.error(f"Ticker fetch failed for {symbol}: {str(e)}")
             return None
+        self._ticker_cache[symbol] = (time.monotonic(), ticker)
+        return ticker
+            
+    async def fetch_tickers(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            async with self.semaphore:
+                return await self.exchange.fetch_tickers()
+        except Exception as e:
+            logger.error(f"Tickers fetch failed: {str(e)}")
+            return {}
+            
+    async def fetch_order_book(self, symbol: str, limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        try:
+            async with self.semaphore:
+                return await self.exchange.fetch_order_book(symbol, limit)
+        except Exception as e:
+            logger.error(f"Order book fetch failed for {symbol}: {str(e)}")
+            return None
             
     async def fetch_balance(self) -> Dict[str, Any]:
         try:
@@ -33,7 +33,7 @@ class CrossExchangeArbitrageStrategy:
             )
             self._markets_loaded = True
         except Exception as e:
-            log.error(f"[ARB] Market load failed: {e}")
+            log.error("[ARB] Market load failed: %s", e)
 
     async def check_and_trade(self):
         if not self._markets_loaded:
@@ -44,22 +44,30 @@ class CrossExchangeArbitrageStrategy:
         for symbol, _ in self.pairs:
             try:
                 market_id = self.api.get_market_id(symbol)
+                # One venue failing shouldn't discard the other's response
                 p_tick, b_tick = await asyncio.gather(
                     self.api.fetch_ticker(symbol),
-                    self.binance.fetch_ticker(symbol)
+                    self.binance.fetch_ticker(symbol),
+                    return_exceptions=True
                 )
                 
+                if isinstance(p_tick, Exception):
+                    log.warning("[ARB] Phemex ticker failed for %s: %s", symbol, p_tick)
+                    continue
+                if isinstance(b_tick, Exception):
+                    log.warning("[ARB] Binance ticker failed for %s: %s", symbol, b_tick)
+                    continue
                 if not p_tick or not b_tick:
                     continue
                     
-                p_bid = p_tick.get("bid", 0)
-                b_ask = b_tick.get("ask", 0)
+                p_bid = p_tick.get("bid") or 0
+                b_ask = b_tick.get("ask") or 0
                 
                 if p_bid <= 0 or b_ask <= 0:
                     continue
 
                 spread_pct = (p_bid - b_ask) / b_ask
-                log.debug(f"[ARB] {symbol} spread: {spread_pct:.4%}")
+                log.debug("[ARB] %s spread: %.4f%%", symbol, spread_pct * 100)
 
                 if spread_pct >= self.thresh:
                     usdt_balance = self.tracker.get_available_usdt()
@@ -71,7 +79,7 @@ class CrossExchangeArbitrageStrategy:
                         self.exec.execute_order("binance", symbol, "buy", qty),
                         self.exec.execute_order("phemex", market_id, "sell", qty)
                     )
-                    log.info(f"[ARB] Executed arb: {symbol} | QTY={qty:.4f}")
+                    log.info("[ARB] Executed arb: %s | QTY=%.4f", symbol, qty)
 
             except Exception as e:
-                log.error(f"[ARB] Error for {symbol}: {e}")
+                log.error("[ARB] Error for %s: %s", symbol, e, exc_info=True)
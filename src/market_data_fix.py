@@ -4,9 +4,16 @@ import queue
 import logging
 
 class PhemexMDApp(fix.Application):
-    def __init__(self, md_queue):
+    def __init__(self):
         super().__init__()
-        self.md_queue = md_queue
+        # symbol -> (bid, ask), overwritten on every snapshot, so it stays one slot
+        # per symbol however fast ticks arrive. Written from the FIX thread; this is
+        # the only output, so nothing backs up when no one is reading. Read it
+        # through latest_quote(), which takes the lock.
+        self.quotes = {}
+        self.quotes_lock = threading.Lock()
+        # Checked once; the per-tick debug line is skipped entirely when DEBUG is off
+        self._debug = logging.getLogger().isEnabledFor(logging.DEBUG)
 
     def onCreate(self, sessionID): 
         logging.info(f"[FIX] Session created: {sessionID}")
@@ -33,22 +40,34 @@ class PhemexMDApp(fix.Application):
                 bid_px = float(msg.getField(132))  # Bid Price
                 ask_px = float(msg.getField(133))  # Ask Price
 
-                self.md_queue.put_nowait((symbol, bid_px, ask_px))
-                logging.debug(f"[FIX] Received {symbol} B:{bid_px} A:{ask_px}")
+                with self.quotes_lock:
+                    self.quotes[symbol] = (bid_px, ask_px)
+                if self._debug:
+                    logging.debug("[FIX] Received %s B:%s A:%s", symbol, bid_px, ask_px)
 
         except Exception as e:
-            logging.error(f"[FIX] Error processing FIX market data: {e}")
+            logging.error("[FIX] Error processing FIX market data: %s", e)
 
-def start_fix_md_session(config_path, md_queue):
+    def latest_quote(self, symbol):
+        """Newest (bid, ask) for ``symbol``, or None; safe to call from any thread"""
+        with self.quotes_lock:
+            return self.quotes.get(symbol)
+
+def start_fix_md_session(config_path):
+    """Start the FIX market data session.
+
+    Returns (initiator, app), or (None, None) if the session could not be
+    started; quotes are read with ``app.latest_quote(symbol)``.
+    """
     try:
         settings = fix.SessionSettings(config_path)
         storeFactory = fix.FileStoreFactory(settings)
         logFactory   = fix.FileLogFactory(settings)
-        app = PhemexMDApp(md_queue)
+        app = PhemexMDApp()
         initiator = fix.SocketInitiator(app, storeFactory, settings, logFactory)
         initiator.start()
         logging.info("[FIX] FIX Market Data session started")
-        return initiator
+        return initiator, app
     except Exception as e:
         logging.error(f"[FIX] Failed to start FIX session: {e}")
-        return None
\ No newline at end of file
+        return None, None
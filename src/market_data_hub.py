@@ -0,0 +1,244 @@
+# market_data_hub.py
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import ccxt.pro as ccxtpro
+except ImportError:
+    ccxtpro = None
+
+log = logging.getLogger("MarketDataHub")
+
+OHLCV_COLUMNS = ("ts", "open", "high", "low", "close", "volume")
+# One-letter column codes accepted by MarketDataHub.views
+OHLCV_FIELDS = {"t": 0, "o": 1, "h": 2, "l": 3, "c": 4, "v": 5}
+
+class OhlcvBuffer:
+    """Fixed-capacity candle history stored as one float64 row per column.
+
+    Every value is written at slot ``i`` and its mirror ``i + capacity``, so
+    the newest ``n`` candles are always a single contiguous slice and readers
+    get views without copying or rolling the array.
+    """
+
+    __slots__ = ("capacity", "data", "size", "head")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.data = np.zeros((len(OHLCV_COLUMNS), 2 * capacity), dtype=np.float64)
+        self.size = 0
+        self.head = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def last_ts(self) -> float:
+        return self.data[0, (self.head - 1) % self.capacity]
+
+    def append(self, candle):
+        self.data[:, self.head] = candle
+        self.data[:, self.head + self.capacity] = candle
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def update_last(self, candle):
+        last = (self.head - 1) % self.capacity
+        self.data[:, last] = candle
+        self.data[:, last + self.capacity] = candle
+
+    def _window(self, n: int) -> slice:
+        end = (self.head - 1) % self.capacity + self.capacity + 1
+        return slice(end - n, end)
+
+    def column(self, name: str, n: int) -> np.ndarray:
+        return self.data[OHLCV_COLUMNS.index(name), self._window(n)]
+
+    def columns(self, fields: str, n: int) -> Tuple[np.ndarray, ...]:
+        block = self.data[:, self._window(n)]
+        return tuple(block[OHLCV_FIELDS[f]] for f in fields)
+
+    def rows(self, n: int) -> np.ndarray:
+        """(n, 6) view in the exchange's [ts, o, h, l, c, v] row order"""
+        return self.data[:, self._window(n)].T
+
+class MarketDataHub:
+    """Single long-lived WebSocket feed shared by all strategies.
+
+    Subscribes once per symbol to the kline and order book streams and keeps
+    the latest candles and best bid/offer in memory, so strategies read them
+    synchronously instead of issuing a REST call per tick. Readers get None
+    when a symbol is unknown or its stream has gone stale and should fall
+    back to the REST API.
+    """
+
+    def __init__(self, api, config):
+        self.api = api
+        self.config = config
+        self.timeframe = config.get("timeframe", "1m")
+        self.capacity = int(config.get("hub_capacity", 500))
+        self.book_stale_sec = float(config.get("hub_book_stale_sec", 5))
+        self.ohlcv_stale_sec = 2 * api._timeframe_to_seconds(self.timeframe)
+        self.reconnect_delay = float(config.get("hub_reconnect_delay", 2))
+        self.exchange = self._init_exchange()
+
+        self.ohlcv: Dict[str, OhlcvBuffer] = {}
+        self.books: Dict[str, dict] = {}
+        self.bbo: Dict[str, Tuple[float, float]] = {}
+        self.ohlcv_updated: Dict[str, float] = {}
+        self.book_updated: Dict[str, float] = {}
+        self._tasks: Dict[str, List[asyncio.Task]] = {}
+        self._closed = False
+
+    @staticmethod
+    def available() -> bool:
+        return ccxtpro is not None
+
+    def _init_exchange(self):
+        exchange = ccxtpro.phemex({
+            "enableRateLimit": True,
+            "options": {
+                "defaultType": self.config.get("default_type", "swap"),
+            }
+        })
+        if self.config.get("testnet", False):
+            exchange.set_sandbox_mode(True)
+        return exchange
+
+    async def subscribe(self, symbols: Iterable[str]):
+        """Backfill and start streaming any symbols not yet subscribed"""
+        new_symbols = [s for s in symbols if s not in self._tasks]
+        if not new_symbols:
+            return
+
+        backfills = await asyncio.gather(
+            *(self.api.get_ohlcv(s, self.timeframe, limit=self.capacity) for s in new_symbols),
+            return_exceptions=True
+        )
+        for symbol, candles in zip(new_symbols, backfills):
+            if isinstance(candles, Exception):
+                log.warning("Backfill failed for %s: %s", symbol, candles)
+            elif candles:
+                self._merge_candles(symbol, candles)
+            self._tasks[symbol] = [
+                asyncio.create_task(self._watch_ohlcv(symbol)),
+                asyncio.create_task(self._watch_order_book(symbol)),
+            ]
+        log.info("Subscribed to %d symbols on %s", len(new_symbols), self.timeframe)
+
+    async def unsubscribe(self, symbols: Iterable[str]):
+        """Stop streaming ``symbols`` and drop everything kept for them"""
+        dropped = [s for s in symbols if s in self._tasks]
+        if not dropped:
+            return
+
+        tasks = [t for s in dropped for t in self._tasks.pop(s)]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for symbol in dropped:
+            for store in (self.ohlcv, self.books, self.bbo, self.ohlcv_updated, self.book_updated):
+                store.pop(symbol, None)
+            # Best effort: not every exchange (or ccxt version) supports unwatching,
+            # and the cancelled tasks no longer read the streams either way
+            for method, args in (
+                ("un_watch_ohlcv", (symbol, self.timeframe)),
+                ("un_watch_order_book", (symbol,)),
+            ):
+                try:
+                    await getattr(self.exchange, method)(*args)
+                except Exception as e:
+                    log.debug("Unwatch failed for %s: %s", symbol, e)
+        log.info("Unsubscribed from %d symbols", len(dropped))
+
+    async def _watch_ohlcv(self, symbol):
+        while not self._closed:
+            try:
+                candles = await self.exchange.watch_ohlcv(symbol, self.timeframe)
+                self._merge_candles(symbol, candles)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Kline stream error for %s: %s", symbol, e)
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _watch_order_book(self, symbol):
+        while not self._closed:
+            try:
+                book = await self.exchange.watch_order_book(symbol)
+                bids, asks = book.get("bids"), book.get("asks")
+                if bids and asks:
+                    self.books[symbol] = book
+                    self.bbo[symbol] = (float(bids[0][0]), float(asks[0][0]))
+                    self.book_updated[symbol] = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("Order book stream error for %s: %s", symbol, e)
+                await asyncio.sleep(self.reconnect_delay)
+
+    def _merge_candles(self, symbol, candles):
+        buf = self.ohlcv.get(symbol)
+        if buf is None:
+            buf = self.ohlcv[symbol] = OhlcvBuffer(self.capacity)
+        for candle in candles:
+            ts = candle[0]
+            if buf.size and ts == buf.last_ts:
+                buf.update_last(candle[:6])
+            elif not buf.size or ts > buf.last_ts:
+                buf.append(candle[:6])
+        self.ohlcv_updated[symbol] = time.monotonic()
+
+    def _buffer(self, symbol: str, limit: int) -> Optional[OhlcvBuffer]:
+        buf = self.ohlcv.get(symbol)
+        if buf is None or buf.size < limit:
+            return None
+        if time.monotonic() - self.ohlcv_updated[symbol] > self.ohlcv_stale_sec:
+            return None
+        return buf
+
+    def get_ohlcv(self, symbol: str, limit: int) -> Optional[np.ndarray]:
+        """View of the last ``limit`` candles (the last one still forming), or None"""
+        buf = self._buffer(symbol, limit)
+        return None if buf is None else buf.rows(limit)
+
+    def get_column(self, symbol: str, name: str, limit: int) -> Optional[np.ndarray]:
+        """Contiguous view of one OHLCV column over the last ``limit`` candles"""
+        buf = self._buffer(symbol, limit)
+        return None if buf is None else buf.column(name, limit)
+
+    def views(self, symbol: str, fields: str, limit: int) -> Optional[Tuple[np.ndarray, ...]]:
+        """Contiguous views of several columns at once, e.g. ``views(s, "chlv", n)``"""
+        buf = self._buffer(symbol, limit)
+        return None if buf is None else buf.columns(fields, limit)
+
+    def get_closes(self, symbol: str, limit: int) -> Optional[np.ndarray]:
+        return self.get_column(symbol, "close", limit)
+
+    def get_bbo(self, symbol: str) -> Optional[Tuple[float, float]]:
+        updated = self.book_updated.get(symbol)
+        if updated is None or time.monotonic() - updated > self.book_stale_sec:
+            return None
+        return self.bbo.get(symbol)
+
+    def get_order_book(self, symbol: str) -> Optional[dict]:
+        updated = self.book_updated.get(symbol)
+        if updated is None or time.monotonic() - updated > self.book_stale_sec:
+            return None
+        return self.books.get(symbol)
+
+    async def close(self):
+        self._closed = True
+        tasks = [t for symbol_tasks in self._tasks.values() for t in symbol_tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        try:
+            await self.exchange.close()
+        except Exception as e:
+            log.warning("Exchange close failed: %s", e)
@@ -2,76 +2,139 @@
 import logging
 import numpy as np
 import asyncio
-from typing import Optional, Tuple
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from src.utils import RollingExtrema
 
 log = logging.getLogger("Breakout")
 
 class BreakoutStrategy:
-    def __init__(self, api, config, tracker, executor):
+    def __init__(self, api, config, tracker, executor, hub=None):
         self.api = api
         self.config = config
         self.tracker = tracker
         self.executor = executor
-        self.price_scale = {}
+        self.hub = hub
         self.strategy_name = "volume_breakout"
+        # Upper-cased once for the "[TAG]" prefix on every log line
+        self._log_tag = self.strategy_name.upper()
         self.min_contract_size = config.get("min_contract_size", 1)
+        self.timeframe = config.get("timeframe", "1m")
+        self.lookback = int(config.get("breakout_lookback", 20))
+        self.volume_multiplier = float(config.get("volume_multiplier", 2.0))
+        self.ohlcv_limit = self.lookback + 1
+        self.extrema = {}
+        # symbol -> time history was last found too short; skipped until the TTL passes
+        self.insufficient_ttl = float(config.get("insufficient_data_ttl", 60))
+        self._insufficient: Dict[str, float] = {}
 
-    async def _get_price_scale(self, symbol):
-        if symbol not in self.price_scale:
-            market = await self.api.load_market(symbol)
-            self.price_scale[symbol] = market['precision']['price']
-        return self.price_scale[symbol]
+    def _get_extrema(self, symbol):
+        extrema = self.extrema.get(symbol)
+        if extrema is None:
+            extrema = self.extrema[symbol] = RollingExtrema(self.lookback)
+        return extrema
 
-    async def check_signal(self, symbol: str) -> Optional[Tuple[str, float]]:
-        try:
-            if await self.tracker.has_open_position(symbol):
-                return None
-                
-            ohlcv = await self.api.get_ohlcv(
-                symbol, 
-                self.config.get("timeframe", "1m"), 
-                limit=self.config.get("breakout_lookback", 20) + 1
-            )
-            
-            if len(ohlcv) < self.config.get("breakout_lookback", 20) + 1:
+    async def check_signal(self, symbol: str, ohlcv=None) -> Optional[Tuple[str, float]]:
+        now = time.monotonic()
+        missed_at = self._insufficient.get(symbol)
+        if missed_at is not None and now - missed_at < self.insufficient_ttl:
+            return None
+
+        limit = self.ohlcv_limit
+        columns = None
+        if ohlcv is None:
+            if self.hub:
+                columns = self.hub.views(symbol, "thlcv", limit)
+            if columns is None:
+                ohlcv = await self.api.get_ohlcv(symbol, self.timeframe, limit=limit)
+        if columns is None:
+            if len(ohlcv) < limit:
+                self._insufficient[symbol] = now
                 return None
+            arr = np.asarray(ohlcv, dtype=np.float64)[-limit:]
+            columns = (arr[:, 0], arr[:, 2], arr[:, 3], arr[:, 4], arr[:, 5])
+        ts, highs, lows, closes, volumes = columns
+        
+        current_high = float(highs[-1])
+        current_low = float(lows[-1])
+        current_volume = float(volumes[-1])
+        current_close = float(closes[-1])
+
+        # Closed bars only; the last candle is the one being tested
+        extrema = self._get_extrema(symbol)
+        extrema.update(ts[:-1], highs[:-1], lows[:-1])
+        max_high = extrema.max()
+        min_low = extrema.min()
+        avg_volume = volumes[:-1].mean()
+
+        if current_volume < avg_volume * self.volume_multiplier:
+            return None
+
+        size = self.executor.calculate_risk_adjusted_size(symbol, current_close)
+        if size < self.min_contract_size:
+            return None
 
-            ohlcv_arr = np.array(ohlcv)
-            highs = ohlcv_arr[:-1, 2].astype(float)
-            lows = ohlcv_arr[:-1, 3].astype(float)
-            volumes = ohlcv_arr[:-1, 5].astype(float)
+        if current_high > max_high:
+            log.info("[%s] BREAKOUT UP %s | High: %.4f > %.4f", 
+                     self._log_tag, symbol, current_high, max_high)
+            return ("buy", size)
+        elif current_low < min_low:
+            log.info("[%s] BREAKOUT DOWN %s | Low: %.4f < %.4f", 
+                     self._log_tag, symbol, current_low, min_low)
+            return ("sell", size)
             
-            last_candle = ohlcv_arr[-1]
-            current_high = float(last_candle[2])
-            current_low = float(last_candle[3])
-            current_volume = float(last_candle[5])
-            current_close = float(last_candle[4])
+        return None
 
-            max_high = np.max(highs)
-            min_low = np.min(lows)
-            avg_volume = np.mean(volumes)
+    async def check_signal_batch(self, symbols: List[str], ohlcv=None) -> Dict[str, Union[Tuple[str, float], Exception]]:
+        """Evaluate all hub-backed symbols in one vectorized pass.
 
-            if current_volume < avg_volume * self.config.get("volume_multiplier", 2.0):
-                return None
+        Symbols the hub cannot serve fall back to the per-symbol path, using
+        the candles in ``ohlcv`` (symbol -> rows) when the caller prefetched them.
+        A symbol whose check raised maps to the exception instead of a signal.
+        """
+        signals = {}
+        ohlcv = ohlcv or {}
+        limit = self.ohlcv_limit
+        batched, views, fallback = [], [], []
+        for symbol in symbols:
+            view = self.hub.get_ohlcv(symbol, limit) if self.hub else None
+            if view is None:
+                fallback.append(symbol)
+            else:
+                batched.append(symbol)
+                views.append(view)
 
-            price_scale = await self._get_price_scale(symbol)
-            size = await self.executor.calculate_risk_adjusted_size(
-                symbol, 
-                current_close,
-                price_scale
-            )
-            if size < self.min_contract_size:
-                return None
+        if batched:
+            try:
+                stacked = np.stack(views)  # (symbols, lookback + 1, 6)
+                current = stacked[:, -1, :]
+                vol_ok = current[:, 5] >= stacked[:, :-1, 5].mean(axis=1) * self.volume_multiplier
+                max_high = stacked[:, :-1, 2].max(axis=1)
+                min_low = stacked[:, :-1, 3].min(axis=1)
+                breakout_up = vol_ok & (current[:, 2] > max_high)
+                breakout_down = vol_ok & ~breakout_up & (current[:, 3] < min_low)
 
-            if current_high > max_high:
-                log.info("[%s] BREAKOUT UP %s | High: %.4f > %.4f", 
-                         self.strategy_name.upper(), symbol, current_high, max_high)
-                return ("buy", size)
-            elif current_low < min_low:
-                log.info("[%s] BREAKOUT DOWN %s | Low: %.4f < %.4f", 
-                         self.strategy_name.upper(), symbol, current_low, min_low)
-                return ("sell", size)
-                
-        except Exception as e:
-            log.exception("[%s] Error for %s: %s", self.strategy_name.upper(), symbol, e)
-        return None
+                for i in np.flatnonzero(breakout_up | breakout_down):
+                    symbol = batched[i]
+                    size = self.executor.calculate_risk_adjusted_size(symbol, float(current[i, 4]))
+                    if size < self.min_contract_size:
+                        continue
+                    if breakout_up[i]:
+                        log.info("[%s] BREAKOUT UP %s | High: %.4f > %.4f", 
+                                 self._log_tag, symbol, current[i, 2], max_high[i])
+                        signals[symbol] = ("buy", size)
+                    else:
+                        log.info("[%s] BREAKOUT DOWN %s | Low: %.4f < %.4f", 
+                                 self._log_tag, symbol, current[i, 3], min_low[i])
+                        signals[symbol] = ("sell", size)
+            except Exception as e:
+                signals.update(dict.fromkeys(batched, e))
+
+        if fallback:
+            results = await asyncio.gather(
+                *(self.check_signal(s, ohlcv.get(s)) for s in fallback),
+                return_exceptions=True
+            )
+            signals.update((s, signal) for s, signal in zip(fallback, results) if signal)
+        return signals
@@ -1,66 +1,206 @@
 # strategy_ema_rsi.py
 import logging
+from math import isnan
 import numpy as np
-import talib
 import asyncio
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+
+from src._ta_kernels import _ema_rsi_kernel, ema_rsi_batch
+from src.utils import EmaRsiState, limit_numba_threads
+
+try:
+    import talib
+    import talib.stream as talib_stream
+except ImportError:
+    talib = talib_stream = None
 
 log = logging.getLogger("EMARSI")
 
+def _talib_backend(closes, ema_short_p, ema_long_p, rsi_p):
+    # Streaming functions return only the last value, with no output array
+    return (
+        talib_stream.EMA(closes, timeperiod=ema_short_p),
+        talib_stream.EMA(closes, timeperiod=ema_long_p),
+        talib_stream.RSI(closes, timeperiod=rsi_p),
+    )
+
+def _talib_batch(closes, ema_short_p, ema_long_p, rsi_p):
+    return np.array([_talib_backend(row, ema_short_p, ema_long_p, rsi_p) for row in closes])
+
 class EmaRsiStrategy:
-    def __init__(self, api, config, tracker, executor):
+    __slots__ = (
+        "api", "config", "tracker", "executor", "hub", "strategy_name", "_log_tag", "timeframe",
+        "ema_short_period", "ema_long_period", "rsi_period", "rsi_oversold",
+        "rsi_overbought", "delta_bars", "ohlcv_limit", "states", "_compute",
+        "_compute_batch",
+    )
+
+    def __init__(self, api, config, tracker, executor, hub=None):
         self.api = api
         self.config = config
         self.tracker = tracker
         self.executor = executor
-        self.price_scale = {}
+        self.hub = hub
         self.strategy_name = "ema_rsi"
+        # Upper-cased once for the "[TAG]" prefix on every log line
+        self._log_tag = self.strategy_name.upper()
+        self.timeframe = config.get("timeframe", "1m")
+        # Integers, to match the compiled kernel signatures
+        self.ema_short_period = int(config.get("ema_short", 12))
+        self.ema_long_period = int(config.get("ema_long", 26))
+        self.rsi_period = int(config.get("rsi_period", 14))
+        self.rsi_oversold = config.get("rsi_oversold", 30)
+        self.rsi_overbought = config.get("rsi_overbought", 70)
+        # Once a symbol's indicator state is seeded only the newest bars are fetched
+        self.delta_bars = int(config.get("ema_rsi_delta_bars", 5))
+        self.ohlcv_limit = 50 + 5
+        self.states: Dict[str, EmaRsiState] = {}
+        # TA-Lib by default; the numba kernel on request or when TA-Lib is missing
+        if config.get("use_numba", False) or talib is None:
+            self._compute = _ema_rsi_kernel
+            self._compute_batch = ema_rsi_batch
+            limit_numba_threads(config.get("numba_threads"))
+        else:
+            self._compute = _talib_backend
+            self._compute_batch = _talib_batch
 
-    async def _get_price_scale(self, symbol):
-        if symbol not in self.price_scale:
-            market = await self.api.load_market(symbol)
-            self.price_scale[symbol] = market['precision']['price']
-        return self.price_scale[symbol]
-
-    async def check_signal(self, symbol: str) -> Optional[Tuple[str, float]]:
-        try:
-            if await self.tracker.has_open_position(symbol):
-                return None
-                
-            ohlcv = await self.api.get_ohlcv(
-                symbol, 
-                self.config.get("timeframe", "1m"), 
-                limit=50 + 5
+    def _get_state(self, symbol):
+        state = self.states.get(symbol)
+        if state is None:
+            state = self.states[symbol] = EmaRsiState(
+                self.ema_short_period, self.ema_long_period, self.rsi_period
             )
-            
-            if len(ohlcv) < 50:
+        return state
+
+    def fetch_limit(self, symbol) -> int:
+        """Candles the next check needs: the newest few once seeded, else the full window"""
+        state = self.states.get(symbol)
+        return self.delta_bars if state is not None and state.ready else self.ohlcv_limit
+
+    async def _fetch_closes(self, symbol, limit, min_len, ohlcv=None):
+        """(timestamps, closes) of up to ``limit`` candles, or None if fewer than ``min_len``"""
+        if ohlcv is not None and len(ohlcv) < min_len:
+            # Prefetched for a warm state that has since needed reseeding
+            ohlcv = None
+        columns = None
+        if ohlcv is None:
+            if self.hub:
+                columns = self.hub.views(symbol, "tc", limit)
+            if columns is None:
+                ohlcv = await self.api.get_ohlcv(symbol, self.timeframe, limit=limit)
+        if columns is None:
+            if len(ohlcv) < min_len:
                 return None
+            arr = np.asarray(ohlcv, dtype=np.float64)[-limit:]
+            columns = (arr[:, 0], arr[:, 4])
+        return columns
 
-            closes = np.array([bar[4] for bar in ohlcv], dtype=float)
-            ema_short = talib.EMA(closes, timeperiod=self.config.get("ema_short", 12))[-1]
-            ema_long = talib.EMA(closes, timeperiod=self.config.get("ema_long", 26))[-1]
-            rsi = talib.RSI(closes, timeperiod=self.config.get("rsi_period", 14))[-1]
-            
-            if np.isnan(ema_short) or np.isnan(ema_long) or np.isnan(rsi):
+    async def check_signal(self, symbol: str, ohlcv=None) -> Optional[Tuple[str, float]]:
+        # Closed bars advance the state; the last bar is still forming
+        state = self._get_state(symbol)
+        if state.ready:
+            window = await self._fetch_closes(symbol, self.delta_bars, self.delta_bars, ohlcv)
+            if window is None:
                 return None
+            ts, closes = window
+            state.update(ts[:-1], closes[:-1])
 
-            current_price = closes[-1]
-            price_scale = await self._get_price_scale(symbol)
-            size = await self.executor.calculate_risk_adjusted_size(
-                symbol, 
-                current_price,
-                price_scale
+        if state.ready:
+            ema_short, ema_long, rsi = state.peek(closes[-1])
+        else:
+            window = await self._fetch_closes(symbol, self.ohlcv_limit, 50, ohlcv)
+            if window is None:
+                return None
+            ts, closes = window
+            ema_short, ema_long, rsi = self._compute(
+                closes, self.ema_short_period, self.ema_long_period, self.rsi_period
             )
+            # A partial state (e.g. after a gap) has last_ts at the newest bar and
+            # would skip the whole window; seed from scratch instead
+            state.reset()
+            state.update(ts[:-1], closes[:-1])
+        
+        if isnan(ema_short) or isnan(ema_long) or isnan(rsi):
+            return None
+
+        return self._signal(symbol, closes[-1], ema_short, ema_long, rsi)
+
+    async def _fetch_many(self, symbols, limit, min_len, ohlcv):
+        results = await asyncio.gather(
+            *(self._fetch_closes(s, limit, min_len, ohlcv.get(s)) for s in symbols),
+            return_exceptions=True
+        )
+        return results
+
+    async def check_signal_batch(self, symbols: List[str], ohlcv=None) -> Dict[str, Union[Tuple[str, float], Exception]]:
+        """Advance seeded symbols incrementally and seed the rest as one matrix.
+
+        Cold symbols are grouped by window length so each group's indicators
+        are computed in a single backend call. ``ohlcv`` (symbol -> rows) holds
+        candles the caller already fetched. A symbol whose check raised maps
+        to the exception instead of a signal.
+        """
+        ohlcv = ohlcv or {}
+        values = {}
+        failed = {}
+        cold = [s for s in symbols if not self._get_state(s).ready]
+        warm = [s for s in symbols if self.states[s].ready]
+
+        for symbol, window in zip(warm, await self._fetch_many(warm, self.delta_bars, self.delta_bars, ohlcv)):
+            if isinstance(window, Exception):
+                failed[symbol] = window
+                continue
+            if window is None:
+                continue
+            ts, closes = window
+            state = self.states[symbol]
+            state.update(ts[:-1], closes[:-1])
+            if state.ready:
+                values[symbol] = (closes[-1],) + tuple(state.peek(closes[-1]))
+            else:
+                cold.append(symbol)
+
+        groups = {}
+        for symbol, window in zip(cold, await self._fetch_many(cold, self.ohlcv_limit, 50, ohlcv)):
+            if isinstance(window, Exception):
+                failed[symbol] = window
+            elif window is not None:
+                groups.setdefault(len(window[1]), []).append((symbol, window))
+
+        for group in groups.values():
+            try:
+                closes_matrix = np.stack([closes for _, (_, closes) in group])
+                rows = self._compute_batch(
+                    closes_matrix, self.ema_short_period, self.ema_long_period, self.rsi_period
+                )
+            except Exception as e:
+                failed.update((symbol, e) for symbol, _ in group)
+                continue
+            for (symbol, (ts, closes)), row in zip(group, rows):
+                # Reseeded from the full window, as in check_signal
+                state = self.states[symbol]
+                state.reset()
+                state.update(ts[:-1], closes[:-1])
+                values[symbol] = (closes[-1],) + tuple(row)
+
+        signals = failed
+        for symbol, (price, ema_short, ema_long, rsi) in values.items():
+            if isnan(ema_short) or isnan(ema_long) or isnan(rsi):
+                continue
+            signal = self._signal(symbol, price, ema_short, ema_long, rsi)
+            if signal:
+                signals[symbol] = signal
+        return signals
 
-            if ema_short > ema_long and rsi < self.config.get("rsi_oversold", 30):
-                log.info("[%s] BUY %s | EMA: %.4f > %.4f, RSI: %.2f", 
-                         self.strategy_name.upper(), symbol, ema_short, ema_long, rsi)
-                return ("buy", size)
-            elif ema_short < ema_long and rsi > self.config.get("rsi_overbought", 70):
-                log.info("[%s] SELL %s | EMA: %.4f < %.4f, RSI: %.2f", 
-                         self.strategy_name.upper(), symbol, ema_short, ema_long, rsi)
-                return ("sell", size)
-                
-        except Exception as e:
-            log.exception("[%s] Error for %s: %s", self.strategy_name.upper(), symbol, e)
+    def _signal(self, symbol, current_price, ema_short, ema_long, rsi) -> Optional[Tuple[str, float]]:
+        if ema_short > ema_long and rsi < self.rsi_oversold:
+            size = self.executor.calculate_risk_adjusted_size(symbol, current_price)
+            log.info("[%s] BUY %s | EMA: %.4f > %.4f, RSI: %.2f", 
+                     self._log_tag, symbol, ema_short, ema_long, rsi)
+            return ("buy", size)
+        elif ema_short < ema_long and rsi > self.rsi_overbought:
+            size = self.executor.calculate_risk_adjusted_size(symbol, current_price)
+            log.info("[%s] SELL %s | EMA: %.4f < %.4f, RSI: %.2f", 
+                     self._log_tag, symbol, ema_short, ema_long, rsi)
+            return ("sell", size)
         return None
@@ -1,67 +1,82 @@
 # strategy_grid.py
 import logging
+import math
 import numpy as np
 import asyncio
-from typing import Optional, Tuple
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from ccxt import RateLimitExceeded
 
 log = logging.getLogger("GridStrategy")
 
 class GridStrategy:
-    def __init__(self, api, config, tracker, executor):
+    __slots__ = (
+        "api", "config", "tracker", "executor", "hub", "timeframe", "lookback",
+        "threshold", "strategy_name", "_log_tag", "min_contract_size", "testnet", "ohlcv_limit",
+        "insufficient_ttl", "_insufficient",
+    )
+
+    def __init__(self, api, config, tracker, executor, hub=None):
         self.api = api
         self.config = config
         self.tracker = tracker
         self.executor = executor
-        self.price_scale = {}
+        self.hub = hub
         
         self.timeframe = config.get("timeframe", "1m")
         self.lookback = int(config.get("mm_lookback", 10))
         self.threshold = float(config.get("mm_deviation_threshold", 0.002))
+        self.ohlcv_limit = self.lookback + 1
         self.strategy_name = "grid"
+        # Upper-cased once for the "[TAG]" prefix on every log line
+        self._log_tag = self.strategy_name.upper()
         self.min_contract_size = config.get("min_contract_size", 1)
         self.testnet = config.get("testnet", False)
+        self.insufficient_ttl = float(config.get("insufficient_data_ttl", 60))
+        self._insufficient: Dict[str, float] = {}
 
-    async def _get_price_scale(self, symbol):
-        if symbol not in self.price_scale:
-            market = await self.api.load_market(symbol)
-            self.price_scale[symbol] = market['precision']['price']
-        return self.price_scale[symbol]
-
-    async def check_signal(self, symbol: str) -> Optional[Tuple[str, float]]:
+    async def check_signal(self, symbol: str, ohlcv=None) -> Optional[Tuple[str, float]]:
         try:
-            if await self.tracker.has_open_position(symbol):
+            now = time.monotonic()
+            missed_at = self._insufficient.get(symbol)
+            if missed_at is not None and now - missed_at < self.insufficient_ttl:
                 return None
-                
-            # Get OHLCV and ticker in parallel
-            ohlcv_future = self.api.get_ohlcv(
-                symbol, 
-                self.timeframe, 
-                limit=self.lookback + 1
-            )
-            ticker_future = self.api.fetch_ticker(symbol)
+
+            if ohlcv is None and self.hub:
+                ohlcv = self.hub.get_ohlcv(symbol, self.ohlcv_limit)
+            bbo = self.hub.get_bbo(symbol) if self.hub else None
             
-            ohlcv, ticker = await asyncio.gather(ohlcv_future, ticker_future)
+            if bbo is None:
+                # Get OHLCV (unless already supplied) and ticker in parallel
+                if ohlcv is None:
+                    ohlcv, ticker = await asyncio.gather(
+                        self.api.get_ohlcv(symbol, self.timeframe, limit=self.ohlcv_limit),
+                        self.api.fetch_ticker(symbol)
+                    )
+                else:
+                    ticker = await self.api.fetch_ticker(symbol)
+                if not ticker:
+                    return None
+                bbo = (float(ticker.get("bid") or 0), float(ticker.get("ask") or 0))
+            elif ohlcv is None:
+                ohlcv = await self.api.get_ohlcv(symbol, self.timeframe, limit=self.ohlcv_limit)
             
-            if not ohlcv or len(ohlcv) < 2 or not ticker:
+            if len(ohlcv) < 2:
+                self._insufficient[symbol] = now
                 return None
 
-            # Calculate average price
-            closes = np.array([c[4] for c in ohlcv[-self.lookback:]], dtype=float)
-            avg_price = np.mean(closes)
+            # Calculate average price; hub/prefetched candles are already arrays
+            tail = ohlcv[-self.lookback:]
+            closes = tail[:, 4] if isinstance(tail, np.ndarray) else [c[4] for c in tail]
+            avg_price = math.fsum(closes) / len(closes)
             
             # Get current prices
-            bid = float(ticker.get("bid", 0))
-            ask = float(ticker.get("ask", 0))
+            bid, ask = bbo
             if bid <= 0 or ask <= 0:
                 return None
                 
             mid_price = (bid + ask) / 2
-            price_scale = await self._get_price_scale(symbol)
-            size = await self.executor.calculate_risk_adjusted_size(
-                symbol, 
-                mid_price,
-                price_scale
-            )
+            size = self.executor.calculate_risk_adjusted_size(symbol, mid_price)
             
             if size < self.min_contract_size:
                 return None
@@ -69,16 +84,67 @@ class GridStrategy:
             # Grid signals
             if mid_price < avg_price * (1 - self.threshold):
                 log.info("[%s] BUY %s @ %.4f (Below avg: %.4f)", 
-                         self.strategy_name.upper(), symbol, mid_price, avg_price)
+                         self._log_tag, symbol, mid_price, avg_price)
                 return ("buy", size)
             elif mid_price > avg_price * (1 + self.threshold):
                 log.info("[%s] SELL %s @ %.4f (Above avg: %.4f)", 
-                         self.strategy_name.upper(), symbol, mid_price, avg_price)
+                         self._log_tag, symbol, mid_price, avg_price)
                 return ("sell", size)
                 
-        except self.api.RateLimitExceeded:
-            log.warning("[%s] Rate limit exceeded for %s", self.strategy_name.upper(), symbol)
-            await asyncio.sleep(10)
-        except Exception as e:
-            log.exception("[%s] Error for %s: %s", self.strategy_name.upper(), symbol, e)
+        except RateLimitExceeded:
+            # ApiHandler already backs off; the next cycle retries this symbol
+            log.warning("[%s] Rate limit exceeded for %s", self._log_tag, symbol)
         return None
+
+    async def check_signal_batch(self, symbols: List[str], ohlcv=None) -> Dict[str, Union[Tuple[str, float], Exception]]:
+        """Compare every hub-backed symbol's mid price to its average in one pass.
+
+        Symbols without fresh hub candles and quotes fall back to the
+        per-symbol path, using the candles in ``ohlcv`` when prefetched.
+        A symbol whose check raised maps to the exception instead of a signal.
+        """
+        signals = {}
+        ohlcv = ohlcv or {}
+        batched, closes, quotes, fallback = [], [], [], []
+        for symbol in symbols:
+            view = self.hub.get_closes(symbol, self.lookback) if self.hub else None
+            bbo = self.hub.get_bbo(symbol) if view is not None else None
+            if bbo is None:
+                fallback.append(symbol)
+            else:
+                batched.append(symbol)
+                closes.append(view)
+                quotes.append(bbo)
+
+        if batched:
+            try:
+                avg_price = np.stack(closes).mean(axis=1)
+                bbo = np.asarray(quotes, dtype=np.float64)
+                valid = (bbo[:, 0] > 0) & (bbo[:, 1] > 0)
+                mid_price = bbo.sum(axis=1) / 2
+                below = valid & (mid_price < avg_price * (1 - self.threshold))
+                above = valid & (mid_price > avg_price * (1 + self.threshold))
+
+                for i in np.flatnonzero(below | above):
+                    symbol = batched[i]
+                    size = self.executor.calculate_risk_adjusted_size(symbol, float(mid_price[i]))
+                    if size < self.min_contract_size:
+                        continue
+                    if below[i]:
+                        log.info("[%s] BUY %s @ %.4f (Below avg: %.4f)", 
+                                 self._log_tag, symbol, mid_price[i], avg_price[i])
+                        signals[symbol] = ("buy", size)
+                    else:
+                        log.info("[%s] SELL %s @ %.4f (Above avg: %.4f)", 
+                                 self._log_tag, symbol, mid_price[i], avg_price[i])
+                        signals[symbol] = ("sell", size)
+            except Exception as e:
+                signals.update(dict.fromkeys(batched, e))
+
+        if fallback:
+            results = await asyncio.gather(
+                *(self.check_signal(s, ohlcv.get(s)) for s in fallback),
+                return_exceptions=True
+            )
+            signals.update((s, signal) for s, signal in zip(fallback, results) if signal)
+        return signals
@@ -1,74 +1,312 @@
 # strategy_manager.py
 import logging
 import asyncio
+import sys
 import time
-import importlib
-from collections import defaultdict
+import numpy as np
+from typing import Dict, List, Tuple
+
+from src.strategy_scalping import ScalpingStrategy
+from src.strategy_breakout import BreakoutStrategy
+from src.strategy_ema_rsi import EmaRsiStrategy
+from src.strategy_grid import GridStrategy
 
 log = logging.getLogger("StrategyManager")
 
+# Queued once per worker by close() to tell it to exit
+_STOP = object()
+
+# How many cycles pass between sweeps of expired cooldown entries
+_COOLDOWN_PURGE_CYCLES = 100
+
+_STRATEGY_CLASSES = {
+    "scalping": ScalpingStrategy,
+    "volume_breakout": BreakoutStrategy,
+    "ema_rsi": EmaRsiStrategy,
+    "grid": GridStrategy,
+}
+
 class StrategyManager:
-    def __init__(self, config, api, tracker, executor):
+    __slots__ = (
+        "config", "api", "tracker", "executor", "hub", "cooldowns", "strategy_weights",
+        "max_open_positions", "daily_loss_limit", "max_concurrency",
+        "strategies", "_strategy_stack", "_cooldowns_by_strat", "_max_cooldown", "_records",
+        "_symbols_count", "_usdt_universe", "_universe_cached_at", "_universe_ttl",
+        "_rank_signature", "_ranked",
+        "_failure_streak", "_failure_backoff", "_failure_backoff_max", "_priority",
+        "_work_queue", "_workers", "_cycles",
+    )
+
+    def __init__(self, config, api, tracker, executor, hub=None):
         self.config = config
         self.api = api
         self.tracker = tracker
         self.executor = executor
-        self.cooldowns = defaultdict(dict)
+        self.hub = hub
+        # (strategy_id, symbol) -> time.monotonic() of the last executed signal
+        self.cooldowns: Dict[Tuple[str, str], float] = {}
+        self._cycles = 0
         self.strategy_weights = config.get("strategy_weights", {})
         self.max_open_positions = config.get("max_open_positions", 5)
         self.daily_loss_limit = config.get("daily_loss_limit", 0.02)
-        self.position_limits = config.get("position_limits", {})
+        # Size of the worker pool that runs signal checks; started on the first cycle
+        # and kept for the manager's lifetime
+        self.max_concurrency = int(config.get("max_concurrency", 32))
+        self._work_queue = None
+        self._workers = ()
         self.strategies = self._load_strategies()
+        # Static per cycle, so resolved once here instead of in the dispatch loop
+        self._strategy_stack = tuple(
+            sys.intern(s) for s in config.get("strategy_stack", []) if s in self.strategies
+        )
+        cooldowns = config.get("strategy_cooldowns", {})
+        self._cooldowns_by_strat = {sid: cooldowns.get(sid, 60) for sid in self.strategies}
+        self._max_cooldown = max(self._cooldowns_by_strat.values(), default=60)
+        # (strategy_id, strategy, cooldown, batched) in stack order, iterated by the
+        # dispatch loop; batched marks strategies implementing check_signal_batch
+        self._records = tuple(
+            (sid, self.strategies[sid], self._cooldowns_by_strat[sid],
+             hasattr(self.strategies[sid], "check_signal_batch"))
+            for sid in self._strategy_stack
+        )
+        # When strategies disagree on a symbol in one cycle, the heavier weight wins,
+        # then the earlier position in the stack
+        self._priority = {
+            sid: (-self.strategy_weights.get(sid, 1.0), i) for i, sid in enumerate(self._strategy_stack)
+        }
+        self._symbols_count = int(config.get("symbols_count", 10))
+        # USDT-quoted symbols change rarely; the suffix scan is redone at most once per TTL
+        self._usdt_universe = frozenset()
+        self._universe_cached_at = None
+        self._universe_ttl = float(config.get("usdt_universe_ttl_sec", 3600))
+        # Last ranking and the ticker snapshot it came from, reused while no ticker moved
+        self._rank_signature = None
+        self._ranked: List[str] = []
+        # (strategy_id, symbol) -> consecutive check failures; each one after the first
+        # doubles the backoff
+        self._failure_streak: Dict[Tuple[str, str], int] = {}
+        self._failure_backoff = float(config.get("failure_backoff_sec", 60))
+        self._failure_backoff_max = float(config.get("failure_backoff_max_sec", 3600))
 
     def _load_strategies(self):
         strategies = {}
-        strategy_mapping = {
-            "scalping": ("src.strategy_scalping", "ScalpingStrategy"),
-            "volume_breakout": ("src.strategy_breakout", "BreakoutStrategy"),
-            "ema_rsi": ("src.strategy_ema_rsi", "EmaRsiStrategy"),
-            "grid": ("src.strategy_grid", "GridStrategy"),
-        }
-        
         for strategy_id in self.config.get("strategy_stack", []):
-            if strategy_id in strategy_mapping:
-                module_name, class_name = strategy_mapping[strategy_id]
+            strategy_class = _STRATEGY_CLASSES.get(strategy_id)
+            if strategy_class is not None:
                 try:
-                    module = importlib.import_module(module_name)
-                    strategy_class = getattr(module, class_name)
                     strategies[strategy_id] = strategy_class(
-                        self.api, self.config, self.tracker, self.executor
+                        self.api, self.config, self.tracker, self.executor, hub=self.hub
                     )
                     log.info("Loaded strategy: %s", strategy_id)
                 except Exception as e:
                     log.error("Failed to load strategy %s: %s", strategy_id, e)
         return strategies
 
+    async def warmup(self, symbols: list):
+        """Resolve per-symbol metadata up front so the first orders don't stall on it"""
+        results = await asyncio.gather(
+            *(self.api.get_price_scale(s) for s in symbols),
+            return_exceptions=True
+        )
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                log.warning("Price scale warmup failed for %s: %s", symbol, result)
+
+    async def rank_universe(self) -> List[str]:
+        """Top ``symbols_count`` USDT markets by quote volume per unit of spread"""
+        tickers = await self.api.fetch_tickers()
+        if not tickers:
+            return []
+        return self._rank_symbols(tickers)
+        
+    def _rank_symbols(self, tickers) -> List[str]:
+        now = time.monotonic()
+        if self._universe_cached_at is None or now - self._universe_cached_at > self._universe_ttl:
+            self._usdt_universe = frozenset(s for s in tickers if s.endswith("/USDT"))
+            self._universe_cached_at = now
+        syms = list(self._usdt_universe & tickers.keys())
+        n = len(syms)
+        if not n:
+            return []
+        # Any refreshed ticker advances its timestamp; without timestamps, always re-rank
+        newest = max((tickers[s].get("timestamp") or 0 for s in syms), default=0)
+        signature = (n, newest) if newest else None
+        if signature is not None and signature == self._rank_signature:
+            return list(self._ranked)
+        ask = np.fromiter((tickers[s].get("ask") or 0.0 for s in syms), dtype=np.float64, count=n)
+        bid = np.fromiter((tickers[s].get("bid") or 0.0 for s in syms), dtype=np.float64, count=n)
+        vol = np.fromiter((tickers[s].get("quoteVolume") or 0.0 for s in syms), dtype=np.float64, count=n)
+        
+        spread = ask - bid
+        valid = (spread > 0) & (bid > 0) & (vol > 0)
+        score = np.where(valid, vol / np.where(spread > 0, spread, 1.0), -np.inf)
+        k = min(self._symbols_count, int(valid.sum()))
+        if k == 0:
+            return []
+        # O(n) selection of the top k, then sort only those
+        top = np.argpartition(-score, k - 1)[:k]
+        top = top[np.argsort(-score[top])]
+        # Interned so the per-cycle (strategy_id, symbol) lookups hash and compare cheaply
+        self._ranked = [sys.intern(syms[i]) for i in top]
+        self._rank_signature = signature
+        return list(self._ranked)
+        
     async def execute(self, symbols: list):
         if not await self._check_risk_limits():
             return
             
-        now = time.time()
-        tasks = []
+        now = time.monotonic()
+        # Entries older than every cooldown can no longer block anything. Stale
+        # entries don't change eligibility, so they're swept only now and then
+        self._cycles += 1
+        if self._cycles % _COOLDOWN_PURGE_CYCLES == 0:
+            cutoff = now - self._max_cooldown
+            self.cooldowns = {k: t for k, t in self.cooldowns.items() if t > cutoff}
+        plan = []
+        # Strategies don't check open positions themselves; filter once per cycle
+        positions = self._position_snapshot()
+        symbols = [s for s in symbols if s not in positions]
         
-        for strategy_id in self.config.get("strategy_stack", []):
-            strategy = self.strategies.get(strategy_id)
-            if not strategy:
-                continue
+        # Bound once: the comprehension below calls it for every (strategy, symbol) pair
+        last_run = self.cooldowns.get
+        never = -np.inf
+        for strategy_id, strategy, cooldown, batched in self._records:
+            # Keys never run have no entry; -inf keeps them eligible without a None branch
+            eligible = [s for s in symbols if now - last_run((strategy_id, s), never) >= cooldown]
+            if eligible:
+                plan.append((strategy_id, strategy, batched, eligible))
                 
-            for symbol in symbols:
-                if self._position_limit_reached(symbol):
-                    continue
-                    
-                last_run = self.cooldowns[strategy_id].get(symbol, 0)
-                cooldown = self.config.get("strategy_cooldowns", {}).get(strategy_id, 60)
-                if now - last_run < cooldown:
-                    continue
-                    
-                tasks.append(self._process_strategy_signal(strategy_id, strategy, symbol))
+        if not plan:
+            return
+        ohlcv_cache = await self._prefetch_ohlcv(plan)
+        jobs = []
+        for strategy_id, strategy, batched, eligible in plan:
+            timeframe = strategy.timeframe
+            if batched:
+                prefetched = {
+                    s: ohlcv_cache[(s, timeframe)] for s in eligible if (s, timeframe) in ohlcv_cache
+                }
+                jobs.append((self._process_strategy_batch, (strategy_id, strategy, eligible, prefetched)))
+            else:
+                jobs.extend(
+                    (self._process_strategy_signal,
+                     (strategy_id, strategy, symbol, ohlcv_cache.get((symbol, timeframe))))
+                    for symbol in eligible
+                )
+                
+        signals = await self._drain(jobs)
+        orders = self._select_orders(signals)
+        # Orders run concurrently, so each one can't see the others' positions; cap
+        # the batch to the free slots up front, highest-priority strategies first
+        free_slots = max(self.max_open_positions - len(self.tracker.positions), 0)
+        if len(orders) > free_slots:
+            ranked = sorted(orders.items(), key=lambda item: self._priority[item[1][0]])
+            for symbol, (strategy_id, _) in ranked[free_slots:]:
+                log.info("Skipping %s signal for %s: no free position slots", strategy_id, symbol)
+            orders = dict(ranked[:free_slots])
+        if orders:
+            await asyncio.gather(*(
+                self._execute_signal(strategy_id, symbol, signal)
+                for symbol, (strategy_id, signal) in orders.items()
+            ))
+            
+    async def _drain(self, jobs):
+        """Run signal checks on the worker pool and collect what they find.
+
+        Returns a list of (strategy_id, symbol, signal). The workers outlive
+        the cycle, so no tasks are created per job; the cycle just waits for
+        the queue to be fully processed.
+        """
+        if self._work_queue is None:
+            self._work_queue = asyncio.Queue()
+            self._workers = tuple(
+                asyncio.create_task(self._worker()) for _ in range(self.max_concurrency)
+            )
+        signals = []
+        for job, args in jobs:
+            self._work_queue.put_nowait((job, args, signals))
+        await self._work_queue.join()
+        return signals
+            
+    async def _worker(self):
+        queue = self._work_queue
+        while True:
+            item = await queue.get()
+            try:
+                if item is _STOP:
+                    return
+                job, args, signals = item
+                found = await job(*args)
+                if found:
+                    signals.extend(found)
+            except Exception as e:
+                log.exception("Strategy job failed: %s", e)
+            finally:
+                queue.task_done()
+                
+    async def close(self):
+        """Stop the worker pool once the jobs already queued are done"""
+        if self._work_queue is None:
+            return
+        for _ in self._workers:
+            self._work_queue.put_nowait(_STOP)
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._work_queue = None
+        self._workers = ()
+                
+    def _select_orders(self, signals) -> Dict[str, Tuple[str, Tuple[str, float]]]:
+        """symbol -> (strategy_id, signal), keeping one order per symbol per cycle"""
+        orders = {}
+        priority = self._priority
+        for strategy_id, symbol, signal in signals:
+            current = orders.get(symbol)
+            if current is None:
+                orders[symbol] = (strategy_id, signal)
+            elif priority[strategy_id] < priority[current[0]]:
+                log.info("Dropping %s signal for %s in favour of %s", current[0], symbol, strategy_id)
+                orders[symbol] = (strategy_id, signal)
+            else:
+                log.info("Dropping %s signal for %s in favour of %s", strategy_id, symbol, current[0])
+        return orders
+            
+    async def _prefetch_ohlcv(self, plan):
+        """Fetch each (symbol, timeframe) once per cycle for every strategy that needs it.
+
+        Uses the longest window any strategy currently asks for: strategies
+        with a ``fetch_limit(symbol)`` report what they need this cycle (e.g.
+        only the newest bars once their state is warm), the rest their
+        ``ohlcv_limit``. Symbols the hub already serves are skipped since
+        strategies read those directly.
+        """
+        limits = {}
+        for _, strategy, _, eligible in plan:
+            fetch_limit = getattr(strategy, "fetch_limit", None)
+            for symbol in eligible:
+                key = (symbol, strategy.timeframe)
+                limit = fetch_limit(symbol) if fetch_limit else strategy.ohlcv_limit
+                limits[key] = max(limits.get(key, 0), limit)
                 
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        if self.hub:
+            limits = {
+                key: limit for key, limit in limits.items()
+                if key[1] != self.hub.timeframe or self.hub.get_ohlcv(key[0], limit) is None
+            }
+        if not limits:
+            return {}
             
+        keys = list(limits)
+        results = await asyncio.gather(
+            *(self.api.get_ohlcv(s, tf, limit=limits[(s, tf)]) for s, tf in keys),
+            return_exceptions=True
+        )
+        ohlcv_cache = {}
+        for key, candles in zip(keys, results):
+            if isinstance(candles, Exception):
+                log.warning("OHLCV prefetch failed for %s: %s", key[0], candles)
+            elif len(candles):
+                ohlcv_cache[key] = np.asarray(candles, dtype=np.float64)
+        return ohlcv_cache
+        
     async def _check_risk_limits(self):
         daily_pnl = await self.tracker.daily_pnl()
         if daily_pnl <= -self.daily_loss_limit:
@@ -81,19 +319,66 @@ class StrategyManager:
             
         return True
         
-    def _position_limit_reached(self, symbol):
-        if symbol in self.position_limits:
-            position = self.tracker.get_open_position(symbol)
-            if position and position["size"] >= self.position_limits[symbol]:
-                return True
-        return False
-            
-    async def _process_strategy_signal(self, strategy_id, strategy, symbol):
+    def _position_snapshot(self) -> Dict[str, float]:
+        """symbol -> open size, taken once per cycle"""
+        return {pos["symbol"]: pos["size"] for pos in self.tracker.positions.values()}
+
+            
+    async def _process_strategy_batch(self, strategy_id, strategy, symbols, ohlcv=None):
+        """Signals from one batched check, as (strategy_id, symbol, signal).
+
+        Symbols the strategy reports as failed (an exception in place of the
+        signal) are backed off like a failed single-symbol check.
+        """
+        try:
+            signals = await strategy.check_signal_batch(symbols, ohlcv) or {}
+        except Exception as e:
+            log.exception("Batch error in %s: %s", strategy_id, e)
+            for symbol in symbols:
+                self._record_failure(strategy_id, symbol)
+            return None
+            
+        found = []
+        for symbol, signal in signals.items():
+            if isinstance(signal, Exception):
+                log.error("Error in %s for %s: %s", strategy_id, symbol, signal, exc_info=signal)
+                self._record_failure(strategy_id, symbol)
+            else:
+                found.append((strategy_id, symbol, signal))
+        if self._failure_streak:
+            for symbol in symbols:
+                if not isinstance(signals.get(symbol), Exception):
+                    self._failure_streak.pop((strategy_id, symbol), None)
+        return found or None
+            
+    async def _process_strategy_signal(self, strategy_id, strategy, symbol, ohlcv=None):
+        """The signal from one symbol check, as a one-item list like _process_strategy_batch"""
+        try:
+            signal = await strategy.check_signal(symbol, ohlcv)
+        except Exception as e:
+            log.exception("Error in %s for %s: %s", strategy_id, symbol, e)
+            self._record_failure(strategy_id, symbol)
+            return None
+            
+        if self._failure_streak:
+            self._failure_streak.pop((strategy_id, symbol), None)
+            
+        if signal:
+            return [(strategy_id, symbol, signal)]
+        return None
+            
+    def _record_failure(self, strategy_id, symbol):
+        """Keep a failing (strategy, symbol) out of the next cycles, backing off exponentially"""
+        key = (strategy_id, symbol)
+        streak = self._failure_streak.get(key, 0) + 1
+        self._failure_streak[key] = streak
+        # failure_backoff_sec after the first failure, doubling with each one after it
+        backoff = min(self._failure_backoff * 2 ** (streak - 1), self._failure_backoff_max)
+        # cooldowns hold the last run time, so shift it to block the key for ``backoff``
+        self.cooldowns[key] = time.monotonic() + backoff - self._cooldowns_by_strat[strategy_id]
+            
+    async def _execute_signal(self, strategy_id, symbol, signal):
         try:
-            signal = await strategy.check_signal(symbol)
-            if not signal:
-                return
-                
             side, size = signal
             weight = self.strategy_weights.get(strategy_id, 1.0)
             adjusted_size = size * weight
@@ -117,7 +402,10 @@ class StrategyManager:
                 log.info("Executed %s %s: %s @ %s", side.upper(), symbol, 
                          result["filled_size"], result["avg_price"])
                 
-            self.cooldowns[strategy_id][symbol] = time.time()
+            # Never shorten a failure backoff, which is stored as a future last run
+            key = (strategy_id, symbol)
+            now = time.monotonic()
+            self.cooldowns[key] = max(self.cooldowns.get(key, now), now)
                 
         except Exception as e:
             log.exception("Error in %s for %s: %s", strategy_id, symbol, e)
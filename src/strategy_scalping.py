@@ -1,218 +1,132 @@
-# api_handler.py
-import asyncio
+# strategy_scalping.py
 import logging
+import asyncio
 import time
-from typing import List, Optional, Dict, Any
-import ccxt.async_support as ccxt
-from ccxt import NetworkError, ExchangeError, RequestTimeout, BadRequest
-
-logger = logging.getLogger("ApiHandler")
-
-class ApiHandler:
-    def __init__(self, api_key, api_secret, config=None):
-        self.config = config or {}
-        self.testnet = self.config.get("testnet", False)
-        self.exchange = self._init_exchange(api_key, api_secret)
-        self.market_map: Dict[str, str] = {}
-        self.price_scales: Dict[str, int] = {}
-        self.last_market_load = 0
-        self.semaphore = asyncio.Semaphore(10)  # Increased concurrency
-        self.market_load_lock = asyncio.Lock()
-       
-    def _init_exchange(self, api_key, api_secret):
-        params = {
-            "apiKey": api_key,
-            "secret": api_secret,
-            "enableRateLimit": True,
-            "options": {
-                "defaultType": self.config.get("default_type", "swap"),
-                "adjustForTimeDifference": True,
-            }
-        }
-        if self.testnet:
-            params["urls"] = {"api": "https://testnet-api.phemex.com"}
-        return ccxt.phemex(params)
-        
-    async def load_markets(self, reload=False):
-        """Load markets with robust error handling for precision data"""
-        current_time = time.time()
-        if reload or not self.market_map or (current_time - self.last_market_load) > 3600:
-            async with self.market_load_lock:
-                if reload or not self.market_map or (current_time - self.last_market_load) > 3600:
-                    try:
-                        markets = await self.exchange.load_markets()
-                        self.market_map = {}
-                        self.price_scales = {}
-                        
-                        for symbol, market in markets.items():
-                            try:
-                                self.market_map[symbol] = market["id"]
-                                precision = market.get("precision", {})
-                                price_precision = precision.get("price")
-                                
-                                if price_precision is None:
-                                    self.price_scales[symbol] = 100
-                                elif isinstance(price_precision, (int, float)):
-                                    self.price_scales[symbol] = 10 ** int(price_precision)
-                                else:
-                                    self.price_scales[symbol] = 100
-                            except Exception:
-                                self.price_scales[symbol] = 100
-                        
-                        self.last_market_load = current_time
-                        logger.info(f"Loaded {len(markets)} markets")
-                    except Exception as e:
-                        logger.error(f"Market load failed: {str(e)}")
-                        if not self.market_map:
-                            self.market_map = {}
-                            self.price_scales = {}
-                
-    async def get_price_scale(self, symbol: str) -> int:
-        """Get price scale with automatic reload on failure"""
-        if symbol not in self.price_scales:
-            try:
-                market = await self.exchange.load_market(symbol)
-                self.price_scales[symbol] = 10 ** market['precision']['price']
-            except:
-                await self.load_markets(reload=True)
-        return self.price_scales.get(symbol, 100)
-        
-    async def get_contract_size(self, symbol: str) -> float:
-        """Get contract size with fallback"""
-        await self.load_markets()
-        market = self.exchange.markets.get(symbol)
-        return market.get("contractSize", 1.0) if market else 1.0
-        
-    def _timeframe_to_seconds(self, timeframe: str) -> int:
-        units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
-        unit = timeframe[-1]
-        value = int(timeframe[:-1])
-        return value * units.get(unit, 1)
-        
-    async def fetch_ohlcv_robust(
-        self,
-        symbol: str,
-        timeframe: str = "1m",
-        since: Optional[int] = None,
-        limit: Optional[int] = None,
-        params: Optional[Dict[str, Any]] = None,
-        retries: int = 3
-    ) -> List[List[float]]:
-        if not self.market_map:
-            await self.load_markets()
-        
-        if symbol not in self.market_map:
-            await self.load_markets(reload=True)
-            if symbol not in self.market_map:
-                logger.error(f"Symbol {symbol} not found")
-                return []
-
-        params = params.copy() if params else {}
-        original_limit = limit
-
-        # Phemex-specific parameters
-        if self.exchange.id == 'phemex':
-            params['to'] = int(time.time() * 1000)
-            if limit is not None:
-                try:
-                    safe_limit = min(int(limit), 500)
-                except (TypeError, ValueError):
-                    safe_limit = 500
-                limit = safe_limit
-
-        for attempt in range(retries):
-            try:
-                async with self.semaphore:
-                    return await self.exchange.fetch_ohlcv(
-                        symbol, timeframe, since, limit, params
-                    )
-            except BadRequest as e:
-                if "30000" in str(e):
-                    return await self.exchange.fetch_ohlcv(symbol, timeframe, since, limit)
-                raise
-            except (NetworkError, ExchangeError, RequestTimeout) as e:
-                if attempt == retries - 1:
-                    raise
-                wait = 2 ** attempt
-                await asyncio.sleep(wait)
-            except TypeError as e:
-                if "'<' not supported" in str(e) and original_limit is not None:
-                    limit = min(original_limit, 500)
-                    continue
-                raise
-        return []
-        
-    async def get_ohlcv(
-        self, 
-        symbol: str, 
-        timeframe: str = '1m', 
-        limit: int = 20,
-        since: Optional[int] = None
-    ) -> List[List[float]]:
-        return await self.fetch_ohlcv_robust(
-            symbol=symbol,
-            timeframe=timeframe,
-            since=since,
-            limit=limit
-        )
-        
-    async def place_order(
-        self, 
-        symbol: str, 
-        side: str, 
-        order_type: str, 
-        quantity: float, 
-        price_ep: Optional[int] = None, 
-        ioc_timeout: int = 1000
-    ) -> Dict[str, Any]:
-        try:
-            params = {}
-            if price_ep:
-                params["priceEp"] = price_ep
-            if ioc_timeout and order_type == "limit":
-                params["timeInForce"] = "IOC"
-            async with self.semaphore:
-                return await self.exchange.create_order(
-                    symbol, order_type, side, quantity, None, params
-                )
-        except Exception as e:
-            logger.error(f"Order failed: {symbol}, {order_type}, {side}, {price_ep} - {str(e)}")
-            return {"status": "error", "error": str(e)}
-            
-    async def cancel_order(self, symbol: str, order_id: str) -> Optional[Dict[str, Any]]:
-        try:
-            async with self.semaphore:
-                return await self.exchange.cancel_order(order_id, symbol)
-        except Exception as e:
-            logger.error(f"Cancel failed for {order_id}: {str(e)}")
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from src.utils import RollingStats
+
+log = logging.getLogger("Scalping")
+
+class ScalpingStrategy:
+    __slots__ = (
+        "api", "config", "tracker", "executor", "hub", "strategy_name", "_log_tag",
+        "min_contract_size", "state", "timeframe", "sma_short", "sma_long",
+        "vol_mult", "imb_lvl", "imb_thr", "atr_period",
+        "ohlcv_limit", "bar_ms", "_no_history",
+    )
+
+    def __init__(self, api, config, tracker, executor, hub=None):
+        self.api = api
+        self.config = config
+        self.tracker = tracker
+        self.executor = executor
+        self.hub = hub
+        self.strategy_name = "scalping"
+        # Upper-cased once for the "[TAG]" prefix on every log line
+        self._log_tag = self.strategy_name.upper()
+        self.min_contract_size = config.get("min_contract_size", 1)
+        self.state = {}
+
+        self.timeframe = config.get("timeframe", "1m")
+        self.sma_short = int(config.get("sma_short", 20))
+        self.sma_long = int(config.get("sma_long", 50))
+        self.vol_mult = float(config.get("volume_multiplier", 2.0))
+        self.imb_lvl = int(config.get("imbalance_levels", 5))
+        self.imb_thr = float(config.get("imbalance_threshold", 0.2))
+        self.atr_period = int(config.get("atr_period", 14))
+        self.ohlcv_limit = self.sma_long + 1
+        # symbol -> index of the bar during which its history was too short; the
+        # closed-bar window can't change until the next bar opens, so skip until then
+        self.bar_ms = api._timeframe_to_seconds(self.timeframe) * 1000
+        self._no_history: Dict[str, int] = {}
+
+    def _get_state(self, symbol):
+        stats = self.state.get(symbol)
+        if stats is None:
+            stats = RollingStats(self.sma_short, self.sma_long, self.atr_period)
+            self.state[symbol] = stats
+        return stats
+
+    async def check_signal(self, symbol: str, ohlcv=None) -> Optional[Tuple[str, float]]:
+        # Bar boundaries follow exchange (wall-clock) time
+        bar = int(time.time() * 1000) // self.bar_ms
+        if self._no_history.get(symbol) == bar:
+            return None
+
+        # Attributes read more than once below are bound to locals up front
+        limit = self.ohlcv_limit
+        imb_lvl = self.imb_lvl
+        imb_thr = self.imb_thr
+        hub = self.hub
+        api = self.api
+        if ohlcv is not None:
+            ohlcv = ohlcv[-limit:]
+        elif hub:
+            ohlcv = hub.get_ohlcv(symbol, limit)
+        book = hub.get_order_book(symbol) if hub else None
+
+        if ohlcv is None and book is None:
+            ohlcv, book = await asyncio.gather(
+                api.get_ohlcv(symbol, self.timeframe, limit=limit),
+                api.fetch_order_book(symbol, imb_lvl)
+            )
+        elif ohlcv is None:
+            ohlcv = await api.get_ohlcv(symbol, self.timeframe, limit=limit)
+        elif book is None:
+            book = await api.fetch_order_book(symbol, imb_lvl)
+
+        if len(ohlcv) < limit:
+            self._no_history[symbol] = bar
+            return None
+        if not book:
             return None
-            
-    async def fetch_positions(self) -> List[Dict]:
-        try:
-            async with self.semaphore:
-                return await self.exchange.fetch_positions()
-        except Exception as e:
-            logger.error(f"Position fetch failed: {str(e)}")
-            return []
-            
-    async def fetch_ticker(self, symbol: str) -> Optional[Dict[str, Any]]:
-        try:
-            async with self.semaphore:
-                return await self.exchange.fetch_ticker(symbol)
-        except Exception as e:
-            logger.error(f"Ticker fetch failed for {symbol}: {str(e)}")
+        ohlcv = np.asarray(ohlcv, dtype=np.float64)
+        if not np.isfinite(ohlcv[:, 2:6]).all():
             return None
-            
-    async def fetch_balance(self) -> Dict[str, Any]:
-        try:
-            async with self.semaphore:
-                params = {}
-                if self.exchange.id == 'phemex':
-                    params['code'] = 'USD'
-                return await self.exchange.fetch_balance(params)
-        except Exception as e:
-            logger.error(f"Balance fetch failed: {str(e)}")
-            return {}
-            
-    def get_market_id(self, symbol: str) -> str:
-        return self.market_map.get(symbol, symbol)
+
+        bids = book.get("bids")
+        asks = book.get("asks")
+        if not bids or not asks:
+            return None
+        bids_vol = np.asarray(bids[:imb_lvl], dtype=np.float64)[:, 1].sum()
+        asks_vol = np.asarray(asks[:imb_lvl], dtype=np.float64)[:, 1].sum()
+        total = bids_vol + asks_vol
+        imbalance = (bids_vol - asks_vol) / total if total > 0 else 0.0
+        if abs(imbalance) <= imb_thr:
+            return None
+
+        # Only closed bars feed the rolling state; the last bar is still forming
+        stats = self._get_state(symbol)
+        stats.update(ohlcv[:-1])
+        if not stats.ready:
+            self._no_history[symbol] = bar
+            return None
+
+        current_volume = ohlcv[-1, 5]
+        if current_volume < stats.volume_sma * self.vol_mult:
+            return None
+
+        # |imbalance| already exceeds the threshold, so only its sign matters here
+        sma_short = stats.sma_short
+        sma_long = stats.sma_long
+        if sma_short > sma_long and imbalance > 0:
+            side = "buy"
+        elif sma_short < sma_long and imbalance < 0:
+            side = "sell"
+        else:
+            return None
+
+        # A flat window (zero ATR) has no range to trade
+        if stats.atr <= 0:
+            return None
+        # The executor floors to size_step and scales by contract size
+        size = self.executor.calculate_risk_adjusted_size(symbol, float(ohlcv[-1, 4]))
+        if size < self.min_contract_size:
+            return None
+
+        log.info("[%s] %s %s | SMA: %.4f/%.4f, Imbalance: %.2f, ATR: %.4f",
+                 self._log_tag, side.upper(), symbol,
+                 sma_short, sma_long, imbalance, stats.atr)
+        return (side, size)
@@ -1,21 +1,45 @@
 # trade_executor.py
 import asyncio
+import contextlib
+import enum
+import heapq
+import itertools
 import logging
+import math
+import os
 import time
-import random
-import hashlib
 from collections import deque
 
 logger = logging.getLogger("TradeExecutor")
 
-class OrderState:
+# Seconds before a pending order is cancelled / a partial fill is re-placed
+PENDING_TIMEOUT = 30
+PARTIAL_REFRESH = 60
+
+# Tolerance, in ticks, when flooring an order size to a whole size_step
+_TICK_EPSILON = 1e-6
+
+class OrderState(enum.IntEnum):
     PENDING = 1
     PARTIALLY_FILLED = 2
     FILLED = 3
     CANCELLED = 4
     REJECTED = 5
 
+# Status strings indexed by OrderState value
+_STATE_NAMES = ("unknown", "pending", "partial", "filled", "cancelled", "rejected")
+
 class Order:
+    __slots__ = (
+        "order_id", "symbol", "side", "order_type", "quantity", "filled_quantity", "price",
+        "strategy_id", "state", "timestamp", "last_update", "exchange_order_id", "done",
+    )
+    
+    # Process id and start time, fixed at import, keep ids from concurrently running
+    # bots apart; the counter makes them unique within this process
+    _id_prefix = f"{os.getpid():x}-{time.time_ns():x}"
+    _counter = itertools.count()
+    
     def __init__(self, symbol, side, order_type, quantity, price=None, strategy_id=""):
         self.order_id = self._generate_id()
         self.symbol = symbol
@@ -26,32 +50,55 @@ class Order:
         self.price = price
         self.strategy_id = strategy_id
         self.state = OrderState.PENDING
-        self.timestamp = time.time()
-        self.last_update = time.time()
+        # Monotonic: these only ever feed timeouts, which must not jump with the wall clock
+        self.timestamp = time.monotonic()
+        self.last_update = self.timestamp
         self.exchange_order_id = None
+        # Resolved with the order once it reaches a terminal state
+        self.done = asyncio.get_running_loop().create_future()
         
     def _generate_id(self):
-        unique_str = f"{time.time_ns()}-{random.randint(0, 1000000)}"
-        return hashlib.sha256(unique_str.encode()).hexdigest()[:20]
+        return f"{Order._id_prefix}-{next(Order._counter):x}"
         
     def update_fill(self, fill_qty, fill_price):
         self.filled_quantity += fill_qty
-        self.last_update = time.time()
+        self.last_update = time.monotonic()
         if abs(self.filled_quantity - self.quantity) < 1e-6:
-            self.state = OrderState.FILLED
+            self.finish(OrderState.FILLED)
         else:
             self.state = OrderState.PARTIALLY_FILLED
+            
+    def finish(self, state):
+        """Move to a terminal state and wake whoever is waiting on the order"""
+        self.state = state
+        if not self.done.done():
+            self.done.set_result(self)
 
 class AsyncTradeExecutor:
     def __init__(self, api, config):
         self.api = api
         self.config = config
         self.logger = logging.getLogger("AsyncTradeExecutor")
-        self.order_queue = asyncio.Queue()
+        # Bounded so a runaway producer blocks in execute_order instead of growing memory
+        self.order_queue = asyncio.Queue(maxsize=int(config.get("queue_max", 1024)))
         self.active_orders = {}
         self._stop_event = asyncio.Event()
         self._processor_task = None
         self._monitor_task = None
+        # Heap of (deadline, order_id, state): when the monitor has to look at an order
+        # again, valid only while the order is still in that state
+        self._deadlines = []
+        self._deadline_added = asyncio.Event()
+        # Capital at risk per trade and the size step are fixed for the process lifetime
+        self._risk_capital = config.get("trading_capital", 1000) * config.get("risk_pct", 0.01)
+        # size_step as an integer count of ticks of 1 / _size_scale, e.g. 0.25 is 25
+        # ticks of 0.01, so sizes are floored to it in integer arithmetic
+        size_step = float(config.get("size_step", 0.0001))
+        decimals = len(f"{size_step:.12f}".rstrip("0").partition(".")[2])
+        self._size_scale = 10 ** decimals
+        self._size_step_ticks = round(size_step * self._size_scale)
+        if self._size_step_ticks <= 0:
+            raise ValueError(f"size_step must be positive with at most 12 decimals, got {size_step}")
         
     async def start(self):
         self._processor_task = asyncio.create_task(self._process_orders())
@@ -59,6 +106,9 @@ class AsyncTradeExecutor:
         
     async def stop(self):
         self._stop_event.set()
+        self._deadline_added.set()
+        # Wakes the processor, which otherwise waits on the queue indefinitely
+        await self.order_queue.put(None)
         await asyncio.gather(
             self._processor_task,
             self._monitor_task,
@@ -67,6 +117,11 @@ class AsyncTradeExecutor:
         
     async def execute_order(self, symbol, side, quantity, price=None, 
                           price_validation=True, strategy_id=""):
+        """Queue an order and wait for its outcome.
+
+        Blocks on the put while the queue holds ``queue_max`` orders, which is
+        the intended backpressure when producers outpace the exchange.
+        """
         order = Order(
             symbol=symbol,
             side=side,
@@ -76,57 +131,105 @@ class AsyncTradeExecutor:
             strategy_id=strategy_id
         )
         
+        # Registered only once the put returns, so a caller cancelled while blocked
+        # on a full queue leaves nothing behind. Nothing awaits in between, so the
+        # order is visible to the monitor and to lookups before the processor sees it
         await self.order_queue.put(order)
-        return await self._wait_for_order_completion(order.order_id)
+        self.active_orders[order.order_id] = order
+        try:
+            return await self._wait_for_order_completion(order)
+        finally:
+            self._forget_if_done(order)
         
-    async def calculate_risk_adjusted_size(self, symbol, price):
-        risk_pct = self.config.get("risk_pct", 0.01)
-        contract_size = await self.api.get_contract_size(symbol)
-        capital = self.config.get("trading_capital", 1000)
-        return (capital * risk_pct) / (price * contract_size)
+    def calculate_risk_adjusted_size(self, symbol, price):
+        """Size risking ``risk_pct`` of capital, floored to a whole ``size_step``"""
+        contract_size = self.api.cached_contract_size(symbol)
+        scale = self._size_scale
+        # The epsilon absorbs float error, so an exact tick count isn't floored one short
+        ticks = math.floor(self._risk_capital * scale / (price * contract_size) + _TICK_EPSILON)
+        ticks -= ticks % self._size_step_ticks
+        return ticks / scale
         
-    async def _wait_for_order_completion(self, order_id, timeout=30):
-        start = time.time()
-        while time.time() - start < timeout:
-            order = self.active_orders.get(order_id)
-            if order and order.state in (OrderState.FILLED, OrderState.CANCELLED, OrderState.REJECTED):
-                return {
-                    "status": self._state_to_string(order.state),
-                    "filled_size": order.filled_quantity,
-                    "avg_price": order.price
-                }
-            await asyncio.sleep(0.1)
-        return {"status": "timeout"}
+    async def _wait_for_order_completion(self, order, timeout=30):
+        try:
+            # Shielded so a timeout here leaves the order's future usable
+            await asyncio.wait_for(asyncio.shield(order.done), timeout)
+        except asyncio.TimeoutError:
+            return {"status": "timeout"}
+        return {
+            "status": self._state_to_string(order.state),
+            "filled_size": order.filled_quantity,
+            "avg_price": order.price
+        }
         
     def _state_to_string(self, state):
-        return {
-            OrderState.FILLED: "filled",
-            OrderState.PARTIALLY_FILLED: "partial",
-            OrderState.CANCELLED: "cancelled",
-            OrderState.REJECTED: "rejected"
-        }.get(state, "unknown")
+        try:
+            return _STATE_NAMES[state]
+        except IndexError:
+            return "unknown"
         
     async def _process_orders(self):
-        while not self._stop_event.is_set():
+        """Block for the next order, then take everything else already queued.
+
+        A burst is placed concurrently in one gather instead of one
+        scheduler round trip per order. A None sentinel from stop() ends
+        the loop: orders queued ahead of it are still placed, anything
+        queued behind it is cancelled so its waiter returns.
+        """
+        queue = self.order_queue
+        while True:
+            batch = [await queue.get()]
+            while True:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            stopping = None in batch
+            orders = batch[:batch.index(None)] if stopping else batch
             try:
-                order = await asyncio.wait_for(self.order_queue.get(), timeout=1.0)
-                self.active_orders[order.order_id] = order
-                
-                if order.state == OrderState.PENDING:
-                    success = await self._execute_order(order)
-                    if not success:
-                        await self._handle_order_failure(order)
-                        
-                self.order_queue.task_done()
-            except asyncio.TimeoutError:
-                continue
-            except Exception as e:
-                self.logger.error("Order processing error: %s", e)
+                await asyncio.gather(*(self._process_order(o) for o in orders))
+            finally:
+                for _ in batch:
+                    queue.task_done()
+            if stopping:
+                # Follow-ups requeued by the last batch land behind the sentinel too
+                late = batch[len(orders) + 1:]
+                while not queue.empty():
+                    late.append(queue.get_nowait())
+                    queue.task_done()
+                for order in late:
+                    if order is not None:
+                        order.finish(OrderState.CANCELLED)
+                        self._forget_if_done(order)
+                break
                 
+    async def _process_order(self, order):
+        try:
+            self.active_orders[order.order_id] = order
+            
+            if order.state == OrderState.PENDING:
+                self._schedule(order.timestamp + PENDING_TIMEOUT, order)
+                success = await self._execute_order(order)
+                if not success:
+                    await self._handle_order_failure(order)
+                    
+        except Exception as e:
+            self.logger.error("Order processing error: %s", e, exc_info=True)
+        finally:
+            self._forget_if_done(order)
+            
+    def _forget_if_done(self, order):
+        """Drop a terminal order from active_orders so the dict only holds in-flight ones.
+
+        Waiters hold the Order itself, so removing it here loses nothing.
+        """
+        if order.done.done():
+            self.active_orders.pop(order.order_id, None)
+            
     async def _execute_order(self, order):
         try:
-            scale = await self.api.get_price_scale(order.symbol)
-            price_ep = int(order.price * scale) if order.price else None
+            # Market orders carry no price, so they don't need the scale at all
+            price_ep = int(order.price * await self.api.get_price_scale(order.symbol)) if order.price else None
             
             response = await self.api.place_order(
                 symbol=order.symbol,
@@ -145,6 +248,8 @@ class AsyncTradeExecutor:
                 return True
             elif response["status"] == "partial":
                 order.update_fill(response["filled"], response["avg_price"])
+                if order.state == OrderState.PARTIALLY_FILLED:
+                    self._schedule(order.last_update + PARTIAL_REFRESH, order)
                 remaining = order.quantity - order.filled_quantity
                 if remaining > 0:
                     new_order = Order(
@@ -155,48 +260,78 @@ class AsyncTradeExecutor:
                         price=order.price,
                         strategy_id=order.strategy_id
                     )
-                    await self.order_queue.put(new_order)
+                    self._requeue(new_order)
                 return True
             else:
-                order.state = OrderState.REJECTED
+                order.finish(OrderState.REJECTED)
                 return False
                 
         except Exception as e:
-            self.logger.error("Order execution failed: %s", e)
+            self.logger.error("Order execution failed: %s", e, exc_info=True)
             return False
             
+    def _requeue(self, order):
+        """Queue a follow-up order from the processor, which can't block on its own queue"""
+        try:
+            self.order_queue.put_nowait(order)
+        except asyncio.QueueFull:
+            self.logger.error("Order queue full, dropping follow-up %s %s", order.side, order.symbol)
+            
+    def _schedule(self, deadline, order):
+        heapq.heappush(self._deadlines, (deadline, order.order_id, order.state))
+        self._deadline_added.set()
+        
     async def _monitor_orders(self):
+        """Sleep until the earliest deadline and act on the orders that are due.
+
+        Entries whose order has since moved to another state are stale and
+        skipped; scheduling a new deadline wakes the monitor early.
+        """
+        deadlines = self._deadlines
         while not self._stop_event.is_set():
-            await asyncio.sleep(5)
-            current_time = time.time()
-            
-            for order_id, order in list(self.active_orders.items()):
-                if order.state == OrderState.PENDING and current_time - order.timestamp > 30:
+            current_time = time.monotonic()
+            while deadlines and deadlines[0][0] <= current_time:
+                _, order_id, state = heapq.heappop(deadlines)
+                order = self.active_orders.get(order_id)
+                if order is None or order.state != state:
+                    continue
+                    
+                if state == OrderState.PENDING:
                     self.logger.warning("Order timeout: %s", order_id)
-                    order.state = OrderState.CANCELLED
+                    order.finish(OrderState.CANCELLED)
                     await self._cancel_order(order)
+                    self.active_orders.pop(order_id, None)
+                    continue
                     
-                if (order.state == OrderState.PARTIALLY_FILLED and 
-                    current_time - order.last_update > 60):
-                    self.logger.info("Refreshing partial order: %s", order_id)
-                    await self._cancel_order(order)
-                    remaining = order.quantity - order.filled_quantity
-                    if remaining > 0:
-                        new_order = Order(
-                            symbol=order.symbol,
-                            side=order.side,
-                            order_type=order.order_type,
-                            quantity=remaining,
-                            price=order.price,
-                            strategy_id=order.strategy_id
-                        )
-                        await self.order_queue.put(new_order)
+                # A later fill pushed its own, later deadline
+                if current_time - order.last_update < PARTIAL_REFRESH:
+                    continue
+                self.logger.info("Refreshing partial order: %s", order_id)
+                await self._cancel_order(order)
+                remaining = order.quantity - order.filled_quantity
+                if remaining > 0:
+                    new_order = Order(
+                        symbol=order.symbol,
+                        side=order.side,
+                        order_type=order.order_type,
+                        quantity=remaining,
+                        price=order.price,
+                        strategy_id=order.strategy_id
+                    )
+                    await self.order_queue.put(new_order)
+                # Superseded by the remainder order even if the cancel didn't confirm
+                self.active_orders.pop(order_id, None)
+                    
+            timeout = deadlines[0][0] - time.monotonic() if deadlines else None
+            self._deadline_added.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._deadline_added.wait(), timeout)
                         
     async def _cancel_order(self, order):
         if order.exchange_order_id:
             try:
                 await self.api.cancel_order(order.symbol, order.exchange_order_id)
-                order.state = OrderState.CANCELLED
+                order.finish(OrderState.CANCELLED)
             except Exception as e:
                 self.logger.warning("Cancel failed: %s", e)
                 
@@ -209,4 +344,4 @@ class AsyncTradeExecutor:
                 quantity=order.quantity,
                 strategy_id=order.strategy_id
             )
-            await self.order_queue.put(market_order)
+            self._requeue(market_order)
@@ -1,12 +1,33 @@
 # utils.py
 import asyncio
 import logging
+import math
 import numpy as np
+import pandas as pd
+from collections import deque
 from typing import Callable, Any
-from functools import wraps
+from functools import lru_cache, wraps
 
 log = logging.getLogger("Utils")
 
+try:
+    import numba
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba is optional; kernels then run as plain Python
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+def limit_numba_threads(count):
+    """Cap the threads parallel kernels may use (NUMBA_NUM_THREADS is the upper bound)"""
+    if NUMBA_AVAILABLE and count:
+        numba.set_num_threads(max(1, min(int(count), numba.config.NUMBA_NUM_THREADS)))
+
 def get_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
     if not logger.handlers:
@@ -28,7 +49,7 @@ def exponential_backoff(retries: int = 3, delay: float = 1.0, max_delay: float =
                     return await func(*args, **kwargs)
                 except Exception as e:
                     attempt += 1
-                    log.warning(f"[BACKOFF] {func.__name__} failed (attempt {attempt}/{retries}): {e}")
+                    log.warning("[BACKOFF] %s failed (attempt %d/%d): %s", func.__name__, attempt, retries, e)
                     if attempt >= retries:
                         raise
                     await asyncio.sleep(min(wait, max_delay))
@@ -56,3 +77,308 @@ def calculate_spread_zscore(ohlcv_a, ohlcv_b):
         return (spread[-1] - mean) / std
     except Exception:
         return None
+
+def get_sma(values):
+    if len(values) == 0:
+        return None
+    return float(np.mean(np.asarray(values, dtype=np.float64)))
+
+def calculate_atr(ohlcv, period=14):
+    """Wilder ATR over the given candles; None if there is not enough history."""
+    if len(ohlcv) <= period:
+        return None
+    arr = np.asarray(ohlcv, dtype=np.float64)
+    return float(get_atr_kernel(period)(arr[:, 2], arr[:, 3], arr[:, 4]))
+
+def _wilder_smooth_pd(values, period):
+    # Seed with the SMA of the first period, then alpha = 1/period recursion
+    seeded = np.concatenate(([math.fsum(values[:period]) / period], values[period:]))
+    return pd.Series(seeded).ewm(alpha=1.0 / period, adjust=False).mean().iloc[-1]
+
+def _atr_np(high, low, close, period):
+    if high.shape[0] <= period:
+        return np.nan
+    tr = np.maximum.reduce([
+        high[1:] - low[1:], np.abs(high[1:] - close[:-1]), np.abs(low[1:] - close[:-1])
+    ])
+    return _wilder_smooth_pd(tr, period)
+
+@lru_cache(maxsize=None)
+def get_atr_kernel(period: int):
+    """Wilder ATR kernel ``f(high, low, close) -> float`` specialized for ``period``.
+
+    Under numba ``period`` is a closure constant, so each period gets its own
+    compiled loop with a fixed trip count for the seed, built eagerly from its
+    signature the first time the period is requested. The kernel returns NaN
+    when there are not more than ``period`` bars.
+    """
+    if not NUMBA_AVAILABLE:
+        return lambda high, low, close: _atr_np(high, low, close, period)
+
+    @njit("float64(float64[:], float64[:], float64[:])")
+    def kernel(high, low, close):
+        n = high.shape[0]
+        if n <= period:
+            return np.nan
+        # Kahan-summed SMA seed, then Wilder's recursion
+        total = 0.0
+        comp = 0.0
+        for i in range(1, period + 1):
+            tr = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+            y = tr - comp
+            t = total + y
+            comp = (t - total) - y
+            total = t
+        atr = total / period
+        for i in range(period + 1, n):
+            tr = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+            atr = (atr * (period - 1) + tr) / period
+        return atr
+
+    return kernel
+
+class RollingStats:
+    """Running SMA/ATR state for one symbol, advanced one closed bar at a time.
+
+    Instead of recomputing the averages over the whole window on every tick,
+    the sums are adjusted by the bar entering and the bar leaving the window,
+    and ATR follows Wilder's recursion atr = (atr_prev * (n - 1) + tr) / n.
+    """
+
+    def __init__(self, short_period: int, long_period: int, atr_period: int, volume_period: int = None):
+        self.short_period = short_period
+        self.long_period = long_period
+        self.atr_period = atr_period
+        self.volume_period = volume_period or short_period
+        self.reset()
+
+    def reset(self):
+        self.closes = deque(maxlen=self.long_period)
+        self.volumes = deque(maxlen=self.volume_period)
+        self.sma_short_sum = 0.0
+        self.sma_long_sum = 0.0
+        self.volume_sum = 0.0
+        self.atr = None
+        self.prev_close = None
+        self.last_ts = None
+        self._tr_sum = 0.0
+        self._tr_count = 0
+
+    @property
+    def ready(self) -> bool:
+        return len(self.closes) == self.long_period and self.atr is not None
+
+    @property
+    def sma_short(self) -> float:
+        return self.sma_short_sum / self.short_period
+
+    @property
+    def sma_long(self) -> float:
+        return self.sma_long_sum / self.long_period
+
+    @property
+    def volume_sma(self) -> float:
+        return self.volume_sum / self.volume_period
+
+    def push(self, high: float, low: float, close: float, volume: float):
+        if self.prev_close is not None:
+            prev = self.prev_close
+            tr = max(high - low, abs(high - prev), abs(low - prev))
+            if self.atr is None:
+                self._tr_sum += tr
+                self._tr_count += 1
+                if self._tr_count == self.atr_period:
+                    self.atr = self._tr_sum / self.atr_period
+            else:
+                self.atr = (self.atr * (self.atr_period - 1) + tr) / self.atr_period
+        self.prev_close = close
+
+        closes = self.closes
+        if len(closes) >= self.short_period:
+            self.sma_short_sum -= closes[-self.short_period]
+        if len(closes) == self.long_period:
+            self.sma_long_sum -= closes[0]
+        closes.append(close)
+        self.sma_short_sum += close
+        self.sma_long_sum += close
+
+        if len(self.volumes) == self.volume_period:
+            self.volume_sum -= self.volumes[0]
+        self.volumes.append(volume)
+        self.volume_sum += volume
+
+    def update(self, ohlcv):
+        """Fold in the bars of ``ohlcv`` newer than the last one seen.
+
+        ``ohlcv`` must contain closed bars only. If the window no longer
+        overlaps the state (a gap longer than the fetch), the state is reseeded.
+        """
+        if len(ohlcv) == 0:
+            return
+        ohlcv = np.asarray(ohlcv, dtype=np.float64)
+        ts = ohlcv[:, 0]
+        if self.last_ts is not None and ts[0] > self.last_ts:
+            self.reset()
+        start = 0
+        if self.last_ts is not None:
+            start = int(np.searchsorted(ts, self.last_ts, side="right"))
+        # Usually only the newest bar or two; tolist() hands push plain floats
+        for _, _, high, low, close, volume in ohlcv[start:].tolist():
+            self.push(high, low, close, volume)
+        if start < len(ts):
+            self.last_ts = ts[-1]
+
+class EmaRsiState:
+    """Running short/long EMA and Wilder RSI for one symbol over closed bars.
+
+    Seeds the same way TA-Lib does (SMA of the first ``period`` closes, mean
+    of the first ``rsi_period`` gains/losses) and then advances each
+    indicator by its O(1) recurrence as new bars close. ``peek`` applies the
+    still-forming bar without committing it.
+    """
+
+    def __init__(self, short_period: int, long_period: int, rsi_period: int):
+        self.short_period = short_period
+        self.long_period = long_period
+        self.rsi_period = rsi_period
+        self.k_short = 2.0 / (short_period + 1)
+        self.k_long = 2.0 / (long_period + 1)
+        # Wilder smoothing as avg * decay + x * inv instead of two divides per bar
+        self.rsi_inv = 1.0 / rsi_period
+        self.rsi_decay = (rsi_period - 1) / rsi_period
+        self.reset()
+
+    def reset(self):
+        self.ema_short = None
+        self.ema_long = None
+        self.avg_gain = None
+        self.avg_loss = None
+        self.prev_close = None
+        self.last_ts = None
+        self._count = 0
+        self._short_sum = 0.0
+        self._long_sum = 0.0
+        self._gain_sum = 0.0
+        self._loss_sum = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.ema_long is not None and self.avg_gain is not None
+
+    def push(self, close: float):
+        prev = self.prev_close
+        if prev is not None:
+            delta = close - prev
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            if self.avg_gain is None:
+                self._gain_sum += gain
+                self._loss_sum += loss
+                if self._count == self.rsi_period:
+                    self.avg_gain = self._gain_sum * self.rsi_inv
+                    self.avg_loss = self._loss_sum * self.rsi_inv
+            else:
+                self.avg_gain = self.avg_gain * self.rsi_decay + gain * self.rsi_inv
+                self.avg_loss = self.avg_loss * self.rsi_decay + loss * self.rsi_inv
+        self.prev_close = close
+
+        self._count += 1
+        if self.ema_short is None:
+            self._short_sum += close
+            if self._count == self.short_period:
+                self.ema_short = self._short_sum / self.short_period
+        else:
+            self.ema_short += (close - self.ema_short) * self.k_short
+        if self.ema_long is None:
+            self._long_sum += close
+            if self._count == self.long_period:
+                self.ema_long = self._long_sum / self.long_period
+        else:
+            self.ema_long += (close - self.ema_long) * self.k_long
+
+    def peek(self, close: float):
+        """(ema_short, ema_long, rsi) as if ``close`` were the next bar; needs ``ready``"""
+        ema_short = self.ema_short + (close - self.ema_short) * self.k_short
+        ema_long = self.ema_long + (close - self.ema_long) * self.k_long
+        delta = close - self.prev_close
+        avg_gain = self.avg_gain * self.rsi_decay + (delta if delta > 0 else 0.0) * self.rsi_inv
+        avg_loss = self.avg_loss * self.rsi_decay + (-delta if delta < 0 else 0.0) * self.rsi_inv
+        total = avg_gain + avg_loss
+        rsi = 100.0 * avg_gain / total if total > 0 else 0.0
+        return ema_short, ema_long, rsi
+
+    def update(self, ts, closes):
+        """Fold in closed bars newer than the last one seen, reseeding on gaps"""
+        if len(ts) == 0:
+            return
+        if self.last_ts is not None and ts[0] > self.last_ts:
+            self.reset()
+        start = 0
+        if self.last_ts is not None:
+            start = int(np.searchsorted(ts, self.last_ts, side="right"))
+        for i in range(start, len(ts)):
+            self.push(float(closes[i]))
+        if start < len(ts):
+            self.last_ts = ts[-1]
+
+class RollingExtrema:
+    """Rolling max of highs and min of lows over the last ``window`` closed bars.
+
+    Each side is a monotonic deque of (index, value) pairs, so pushing a bar
+    and reading the extremum are amortized O(1) instead of rescanning the
+    window on every tick.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self._highs = deque()
+        self._lows = deque()
+        self._count = 0
+        self.last_ts = None
+
+    @property
+    def ready(self) -> bool:
+        return self._count >= self.window
+
+    def max(self) -> float:
+        return self._highs[0][1]
+
+    def min(self) -> float:
+        return self._lows[0][1]
+
+    def push(self, high: float, low: float):
+        i = self._count
+        highs, lows = self._highs, self._lows
+        while highs and highs[-1][1] <= high:
+            highs.pop()
+        highs.append((i, high))
+        while lows and lows[-1][1] >= low:
+            lows.pop()
+        lows.append((i, low))
+
+        oldest = i - self.window
+        if highs[0][0] <= oldest:
+            highs.popleft()
+        if lows[0][0] <= oldest:
+            lows.popleft()
+        self._count += 1
+
+    def update(self, ts, highs, lows):
+        """Fold in closed bars newer than the last one seen, reseeding on gaps.
+
+        Takes the timestamp, high and low columns of the window separately.
+        """
+        if len(ts) == 0:
+            return
+        if self.last_ts is not None and ts[0] > self.last_ts:
+            self.reset()
+        start = 0
+        if self.last_ts is not None:
+            start = int(np.searchsorted(ts, self.last_ts, side="right"))
+        for i in range(start, len(ts)):
+            self.push(float(highs[i]), float(lows[i]))
+        if start < len(ts):
+            self.last_ts = ts[-1]
@@ -1,20 +1,109 @@
 import logging
+import math
 import asyncio
+import time
+import numpy as np
 from ccxt import RateLimitExceeded
+from src.utils import njit, get_atr_kernel, NUMBA_AVAILABLE
 
 logger = logging.getLogger(__name__)
 
+# No fastmath: it would let the compiler reassociate away the Kahan compensation
+@njit("float64(float64[:, :])", cache=True)
+def _mean_relative_range_jit(ohlcv):
+    total = 0.0
+    comp = 0.0
+    count = 0
+    for i in range(1, ohlcv.shape[0]):
+        prev_close = ohlcv[i - 1, 4]
+        if prev_close > 0:
+            y = (ohlcv[i, 2] - ohlcv[i, 3]) / prev_close - comp
+            t = total + y
+            comp = (t - total) - y
+            total = t
+            count += 1
+    if count == 0:
+        return np.nan
+    return total / count
+
+def _mean_relative_range_np(ohlcv):
+    prev_close = ohlcv[:-1, 4]
+    valid = prev_close > 0
+    if not valid.any():
+        return np.nan
+    ratios = (ohlcv[1:, 2] - ohlcv[1:, 3]) / np.where(valid, prev_close, 1.0)
+    ratios = ratios[valid]
+    return math.fsum(ratios) / len(ratios)
+
+# Mean of (high - low) / prior close, skipping bars with no prior close, with a
+# compensated sum so results near the threshold don't depend on FP drift.
+# Without numba the single vectorized pass beats an interpreted loop.
+if NUMBA_AVAILABLE:
+    mean_relative_range = _mean_relative_range_jit
+else:
+    mean_relative_range = _mean_relative_range_np
+
 class VolatilityRegimeFilter:
-    def __init__(self, api, lookback_period=24, threshold=0.05):
+    """Per-symbol trading gate based on recent volatility.
+
+    ``volatility_mode`` selects the measure:
+      - "range" (default): mean (high - low) / prior close over
+        ``volatility_lookback`` candles of ``volatility_timeframe``; trading is
+        allowed once it reaches ``volatility_threshold``.
+      - "atr": ATR over ``atr_period`` candles of the trading timeframe relative
+        to the last close; trading is allowed while it stays below
+        ``volatility_threshold_atr``.
+    """
+
+    def __init__(self, api, config):
         self.api = api
-        self.lookback_period = lookback_period
-        self.threshold = threshold
+        self.config = config
+        self.mode = config.get("volatility_mode", "range")
+        
+        if self.mode == "atr":
+            self.timeframe = config.get("timeframe", "1m")
+            atr_period = int(config.get("atr_period", 14))
+            self.lookback_period = atr_period + 1
+            # The kernel is NaN until there are more than atr_period bars
+            self.min_bars = self.lookback_period
+            self._atr_kernel = get_atr_kernel(atr_period)
+            self.threshold = config.get("volatility_threshold_atr", 0.015)
+        else:
+            self.timeframe = config.get("volatility_timeframe", "1h")
+            self.lookback_period = int(config.get("volatility_lookback", 24))
+            self.min_bars = 2
+            self.threshold = config.get("volatility_threshold", 0.05)
+        
+        # Symbols with too little history are not re-queried until the TTL passes
+        self.insufficient_ttl = float(config.get("insufficient_data_ttl", 60))
+        self._insufficient = {}
+        # Caps how many symbols are checked at once, so rate-limit retries stay bounded
+        self._check_slots = asyncio.Semaphore(int(config.get("max_concurrent_checks", 8)))
+        
+    def _compute_vol(self, ohlcv: np.ndarray) -> float:
+        if self.mode == "atr":
+            return self._atr_kernel(ohlcv[:, 2], ohlcv[:, 3], ohlcv[:, 4]) / ohlcv[-1, 4]
+        return mean_relative_range(ohlcv)
+        
+    async def filter_symbols(self, symbols):
+        """The symbols whose regime allows trading, checked concurrently"""
+        async def check(symbol):
+            async with self._check_slots:
+                return await self.allow_trading(symbol)
+            
+        allowed = await asyncio.gather(*(check(s) for s in symbols))
+        return [s for s, ok in zip(symbols, allowed) if ok]
         
     async def allow_trading(self, symbol):
         """
         Determine if trading should be allowed based on volatility regime,
         using the ApiHandler’s rate-limited get_ohlcv method.
         """
+        now = time.monotonic()
+        missed_at = self._insufficient.get(symbol)
+        if missed_at is not None and now - missed_at < self.insufficient_ttl:
+            return False
+        
         max_retries = 5
         base_delay = 1.5  # seconds
         
@@ -23,47 +112,40 @@ class VolatilityRegimeFilter:
                 # Use ApiHandler.get_ohlcv (which includes its own semaphore and retry)
                 ohlcv = await self.api.get_ohlcv(
                     symbol,
-                    timeframe='1h',
+                    timeframe=self.timeframe,
                     limit=self.lookback_period
                 )
                 
-                if not ohlcv or len(ohlcv) < 2:
-                    logger.warning(f"Insufficient data for {symbol}")
+                if not ohlcv or len(ohlcv) < self.min_bars:
+                    logger.warning("Insufficient data for %s", symbol)
+                    self._insufficient[symbol] = now
                     return False
                 
-                # Calculate volatility based on high-low relative to prior close
-                price_changes = []
-                for i in range(1, len(ohlcv)):
-                    prev_close = ohlcv[i-1][4]
-                    high = ohlcv[i][2]
-                    low = ohlcv[i][3]
-                    if prev_close > 0:
-                        price_changes.append((high - low) / prev_close)
-                
-                if not price_changes:
+                volatility = self._compute_vol(np.asarray(ohlcv, dtype=np.float64))
+                if not math.isfinite(volatility):
                     return False
+                logger.info("%s volatility (%s): %.4f", symbol, self.mode, volatility)
                 
-                avg_volatility = sum(price_changes) / len(price_changes)
-                logger.info(f"{symbol} volatility: {avg_volatility:.4f}")
-                
-                return avg_volatility >= self.threshold
+                if self.mode == "atr":
+                    return volatility < self.threshold
+                return volatility >= self.threshold
                 
             except RateLimitExceeded:
                 if attempt < max_retries - 1:
                     # Exponential backoff with a small jitter
                     delay = base_delay * (2 ** attempt) + (0.1 * attempt)
                     logger.warning(
-                        f"Rate limit hit for {symbol}. "
-                        f"Retry {attempt+1}/{max_retries} in {delay:.1f}s"
+                        "Rate limit hit for %s. Retry %d/%d in %.1fs",
+                        symbol, attempt + 1, max_retries, delay
                     )
                     await asyncio.sleep(delay)
                     continue
                 else:
                     logger.error(
-                        f"Rate limit exceeded for {symbol} after {max_retries} attempts"
+                        "Rate limit exceeded for %s after %d attempts", symbol, max_retries
                     )
                     return False
                 
             except Exception as e:
-                logger.error(f"Error processing {symbol}: {e}", exc_info=True)
+                logger.error("Error processing %s: %s", symbol, e, exc_info=True)
                 return False